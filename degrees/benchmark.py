@@ -0,0 +1,127 @@
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+
+LOADS = ["dict", "compact", "snapshot"]
+MODES = ["bfs", "bidirectional", "alt"]
+PERCENTILES = [50, 90, 99]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees.load_data and shortest_path.")
+    parser.add_argument("directory")
+    parser.add_argument("--loads", nargs="+", choices=LOADS, default=LOADS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--queries", type=int, default=200,
+                        help="number of random source/target pairs per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--landmarks", type=int, default=8,
+                        help="landmarks to build for the alt mode")
+    parser.add_argument("--json", action="store_true",
+                        help="print one JSON object per run instead of a table")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'load':<9} {'mode':<14} {'load s':>8} {'index s':>8} "
+              f"{'rss MB':>8} {'conn':>5} "
+              + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES))
+    for load in args.loads:
+        for mode in args.modes:
+            if mode == "alt" and load == "dict":
+                # The landmark index needs the compact graph.
+                continue
+            result = run(args.directory, load, mode, args.queries,
+                         args.seed, args.landmarks)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{load:<9} {mode:<14} {result['load_seconds']:>8.3f} "
+                      f"{result['index_seconds']:>8.3f} "
+                      f"{result['peak_rss_mb']:>8.1f} {result['connected']:>5} "
+                      + " ".join(f"{result['latency_ms'][f'p{p}']:>9.3f}"
+                                 for p in PERCENTILES))
+
+
+def run(directory, load, mode, num_queries, seed=0, num_landmarks=8):
+    """
+    Loads the dataset with the given `load` strategy in a fresh process and
+    times `num_queries` seeded random queries with the given search mode.
+
+    Each run gets its own interpreter so that load time and peak RSS are
+    not skewed by earlier runs.
+    """
+    context = multiprocessing.get_context("spawn")
+    if load == "snapshot":
+        # Time loading a fresh snapshot, not writing it.
+        with context.Pool(1) as pool:
+            pool.apply(_prepare_snapshot, (directory,))
+    with context.Pool(1) as pool:
+        return pool.apply(_run, (directory, load, mode, num_queries,
+                                 seed, num_landmarks))
+
+
+def _prepare_snapshot(directory):
+    import degrees
+
+    degrees.load_data(directory, snapshot=True)
+
+
+def _run(directory, load, mode, num_queries, seed, num_landmarks):
+    import degrees
+
+    start = time.perf_counter()
+    degrees.load_data(directory, compact=load == "compact",
+                      snapshot=load == "snapshot")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if mode == "alt":
+        degrees.landmark_index = degrees.LandmarkIndex.build(
+            degrees.graph, num_landmarks)
+    index_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    latencies = []
+    connected = 0
+    for _ in range(num_queries):
+        source = rng.choice(person_ids)
+        target = rng.choice(person_ids)
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        connected += path is not None
+
+    return {
+        "load": load,
+        "mode": mode,
+        "queries": num_queries,
+        "connected": connected,
+        "load_seconds": load_seconds,
+        "index_seconds": index_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "latency_ms": {f"p{p}": _percentile(latencies, p) * 1000
+                       for p in PERCENTILES},
+    }
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+if __name__ == "__main__":
+    main()
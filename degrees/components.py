@@ -0,0 +1,174 @@
+from array import array
+
+
+class ComponentIndex():
+    """
+    Connected-component label for every person, so that whether two
+    people are connected at all is a pair of lookups.
+
+    `labels` maps each person (an index into a CompactGraph, or a
+    person_id for the dict backend) to a component number, and
+    `sizes[c]` is the number of people in component `c`.
+
+    Added people and stars are merged in incrementally by union-find over
+    the labels. Removals can only split components, so after one the
+    index is marked `stale`: a False from connected() still proves two
+    people are not connected, but sizes need a rebuild to be exact.
+    """
+
+    def __init__(self, labels, sizes):
+        self.labels = labels
+        self.sizes = sizes
+        # Union-find parent of each label, for components merged by updates
+        self.label_parents = array("i", range(len(sizes)))
+        self.stale = False
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Labels the person indices of a CompactGraph.
+        """
+        parents = _union_movies(
+            graph.num_people,
+            (graph.people_for_movie(movie) for movie in range(graph.num_movies)))
+        labels, sizes = _label(parents, graph.has_person)
+        return cls(labels, sizes)
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Labels the person_ids of the `people` and `movies` dicts.
+        """
+        person_ids = list(people)
+        index = {person_id: i for i, person_id in enumerate(person_ids)}
+        parents = _union_movies(
+            len(person_ids),
+            ([index[person_id] for person_id in movie["stars"]]
+             for movie in movies.values()))
+        labels, sizes = _label(parents)
+        return cls(dict(zip(person_ids, labels)), sizes)
+
+    @property
+    def num_components(self):
+        return sum(1 for label in range(len(self.sizes))
+                   if self.label_parents[label] == label and self.sizes[label])
+
+    def connected(self, a, b):
+        return self._find(self.labels[a]) == self._find(self.labels[b])
+
+    def component_size(self, person):
+        """
+        Returns the number of people in the same component as `person`.
+        """
+        return self.sizes[self._find(self.labels[person])]
+
+    def size_histogram(self):
+        """
+        Returns a dict mapping each component size to the number of
+        components of that size, largest first.
+        """
+        histogram = {}
+        roots = [label for label in range(len(self.sizes))
+                 if self.label_parents[label] == label]
+        for size in sorted((self.sizes[root] for root in roots), reverse=True):
+            if size:
+                histogram[size] = histogram.get(size, 0) + 1
+        return histogram
+
+    def add_person(self, person):
+        """
+        Gives a newly added person a component of their own.
+        """
+        label = len(self.sizes)
+        self.sizes.append(1)
+        self.label_parents.append(label)
+        if isinstance(self.labels, dict):
+            self.labels[person] = label
+        else:
+            self.labels.append(label)
+
+    def add_star(self, person, cast):
+        """
+        Merges a person's component with that of a movie's `cast`, which
+        all share one component.
+        """
+        for other in cast:
+            if other != person:
+                self._union(self.labels[person], self.labels[other])
+                return
+
+    def mark_stale(self):
+        self.stale = True
+
+    def _find(self, label):
+        parents = self.label_parents
+        while parents[label] != label:
+            parents[label] = parents[parents[label]]
+            label = parents[label]
+        return label
+
+    def _union(self, a, b):
+        a = self._find(a)
+        b = self._find(b)
+        if a == b:
+            return
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        self.label_parents[b] = a
+        self.sizes[a] += self.sizes[b]
+
+
+def _union_movies(count, casts):
+    """
+    Runs union-find over `count` people, joining everyone in each cast.
+    Returns the parent array.
+    """
+    parents = array("i", range(count))
+    sizes = array("i", [1]) * count
+
+    def find(x):
+        while parents[x] != x:
+            # Path halving
+            parents[x] = parents[parents[x]]
+            x = parents[x]
+        return x
+
+    for cast in casts:
+        cast = iter(cast)
+        first = next(cast, None)
+        if first is None:
+            continue
+        root = find(first)
+        for person in cast:
+            other = find(person)
+            if other == root:
+                continue
+            # Union by size
+            if sizes[other] > sizes[root]:
+                root, other = other, root
+            parents[other] = root
+            sizes[root] += sizes[other]
+
+    for x in range(count):
+        parents[x] = find(x)
+    return parents
+
+
+def _label(roots, present=None):
+    """
+    Renumbers union-find roots to dense component labels.
+    Returns (labels, sizes). People for whom `present` returns False (those
+    removed by updates) get a label but are not counted in its size.
+    """
+    labels = array("i", [0]) * len(roots)
+    sizes = array("i")
+    numbers = {}
+    for x, root in enumerate(roots):
+        label = numbers.get(root)
+        if label is None:
+            label = numbers[root] = len(sizes)
+            sizes.append(0)
+        labels[x] = label
+        if present is None or present(x):
+            sizes[label] += 1
+    return labels, sizes
@@ -1,7 +1,21 @@
+import argparse
 import csv
+import json
+import multiprocessing
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from components import ComponentIndex
+from delta import OPERATIONS, read_delta, validate
+from graph import CompactGraph, MoviesView, PeopleView
+from ingest import read_star_edges
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from search import (a_star_search, bidirectional_search, breadth_first_search,
+                    shortest_path_dag)
+from snapshot import SNAPSHOT_NAME, fingerprint, load_snapshot, write_snapshot
+from stats import SearchStats
+from treecache import BFSTreeCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,14 +26,108 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CSR adjacency, set when load_data runs in compact mode
+graph = None
 
-def load_data(directory) -> None:
+# Landmark distances for the "alt" search mode, set when load_data builds them
+landmark_index = None
+
+# Number of landmarks load_data was asked for, to rebuild the landmark
+# index with after updates
+landmark_count = 0
+
+# Connected-component labels, set when load_data builds them
+component_index = None
+
+# Cached BFS trees of recent sources, set by enable_tree_cache
+tree_cache = None
+
+# Prefix and fuzzy lookup over the keys of names, built on first use and
+# kept up to date by updates
+name_index = None
+
+SEARCH_MODES = ["bfs", "bidirectional", "alt"]
+
+# Number of queries handed to a batch worker at a time
+BATCH_CHUNK_SIZE = 64
+
+
+def load_data(directory, compact=False, snapshot=False, num_landmarks=0,
+              components=False, workers=1, delta=None) -> None:
     """
     Load data from CSV files into memory.
 
     Now names is a dict with people's name as the key and their ID as the value.
     People is a dict where ID is the key and a dict of name, birthday and movies is the value.
     Movies is a dict with ID as the key and a dict of title, year, and stars as its value.
+
+    With `compact`, the graph is loaded into a CompactGraph instead and
+    people and movies become read-only views over it with the same layout.
+
+    With `snapshot`, the compact graph is memory-mapped from a binary
+    snapshot in the data directory. The snapshot is rebuilt whenever the
+    CSV files' sizes or mtimes no longer match the ones it was built from.
+
+    With `num_landmarks`, the compact graph is loaded and a LandmarkIndex
+    over that many people is built for the "alt" search mode.
+
+    With `components`, a ComponentIndex is built so that people in
+    different connected components are reported as not connected at once.
+
+    With more than one worker, stars.csv is parsed by a process pool.
+
+    With `delta`, the updates in that delta file are applied after loading.
+    """
+    global landmark_index, component_index, landmark_count, name_index
+
+    if compact or snapshot or num_landmarks:
+        _load_compact(directory, snapshot, workers)
+    else:
+        _load_csv(directory, workers)
+    # Built from the new names on first use (see _name_index)
+    name_index = None
+
+    if components:
+        if graph is not None:
+            component_index = ComponentIndex.from_graph(graph)
+        else:
+            component_index = ComponentIndex.from_dicts(people, movies)
+    if delta is not None:
+        apply_delta_file(delta)
+    landmark_count = num_landmarks
+    if num_landmarks:
+        landmark_index = LandmarkIndex.build(graph, num_landmarks)
+
+
+def _load_compact(directory, snapshot, workers=1):
+    """
+    Loads the CompactGraph, from the snapshot if requested and fresh,
+    and points people, movies and names at it.
+    """
+    global graph, people, movies, names
+
+    if snapshot:
+        snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        sources = fingerprint(directory)
+        loaded = load_snapshot(snapshot_path, sources)
+        if loaded is not None:
+            graph, names = loaded
+            people = PeopleView(graph)
+            movies = MoviesView(graph)
+            return
+
+    graph = CompactGraph.from_csv(directory, workers)
+    if snapshot:
+        write_snapshot(graph, snapshot_path, sources)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+    for person_id, name in zip(graph.person_ids, graph.person_names):
+        names.setdefault(name.lower(), set()).add(person_id)
+
+
+def _load_csv(directory, workers=1):
+    """
+    Loads the CSV files into the people, movies and names dicts.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -45,6 +153,10 @@ def load_data(directory) -> None:
                 "stars": set()
             }
 
+    if workers > 1:
+        _load_stars_parallel(directory, workers)
+        return
+
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -56,14 +168,94 @@ def load_data(directory) -> None:
                 pass
 
 
+def _load_stars_parallel(directory, workers):
+    """
+    Fills in the people and movies sets from integer edges parsed by a
+    process pool, matching the sequential loader: a row with a known person
+    but an unknown movie still adds the movie_id to that person's movies.
+    """
+    person_ids = list(people)
+    movie_ids = list(movies)
+    edge_people, edge_movies, dangling = read_star_edges(
+        f"{directory}/stars.csv",
+        {person_id: i for i, person_id in enumerate(person_ids)},
+        {movie_id: i for i, movie_id in enumerate(movie_ids)},
+        workers)
+
+    for person, movie in zip(edge_people, edge_movies):
+        people[person_ids[person]]["movies"].add(movie_ids[movie])
+        movies[movie_ids[movie]]["stars"].add(person_ids[person])
+    for person, movie_id in dangling:
+        people[person_ids[person]]["movies"].add(movie_id)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the graph into compact CSR arrays")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the graph from a cached binary snapshot")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="build a K-landmark index for --mode alt")
+    parser.add_argument("--components", action="store_true",
+                        help="index connected components to answer "
+                             "disconnected pairs instantly")
+    parser.add_argument("--mode", choices=SEARCH_MODES,
+                        default="bfs", help="search algorithm to use")
+    parser.add_argument("--delta", metavar="FILE",
+                        help="apply the updates in a delta file after loading")
+    parser.add_argument("--cache-mb", type=float, default=0,
+                        help="cache BFS trees of recent sources in up to "
+                             "this many megabytes (implies --compact, and "
+                             "answers every --mode)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated source/target pairs from "
+                             "FILE ('-' for stdin) as JSON lines on stdout")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="with --batch, resolve misspelled names to the "
+                             "closest unambiguous match")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes for loading and --batch")
+    parser.add_argument("--stats", nargs="?", const="-", metavar="FILE",
+                        help="print search statistics as JSON, or write them "
+                             "to FILE; with --batch they are added to each result")
+    args = parser.parse_args()
+    if args.mode == "alt" and args.landmarks <= 0:
+        parser.error("--mode alt needs --landmarks K")
+    # The tree cache runs over the compact graph.
+    compact = args.compact or args.cache_mb > 0
+
+    if args.batch is not None:
+        loader = {
+            "directory": args.directory,
+            "compact": compact,
+            "snapshot": args.snapshot,
+            "num_landmarks": args.landmarks,
+            "components": args.components,
+            "workers": args.workers,
+            "delta": args.delta,
+        }
+        load_data(**loader)
+        if args.cache_mb:
+            enable_tree_cache(int(args.cache_mb * 2 ** 20))
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, args.mode, args.workers, loader,
+                      with_stats=args.stats is not None, fuzzy=args.fuzzy)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, args.mode, args.workers, loader,
+                          with_stats=args.stats is not None, fuzzy=args.fuzzy)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=compact, snapshot=args.snapshot,
+              num_landmarks=args.landmarks, components=args.components,
+              workers=args.workers, delta=args.delta)
+    if args.cache_mb:
+        enable_tree_cache(int(args.cache_mb * 2 ** 20))
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -73,7 +265,8 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = None if args.stats is None else SearchStats()
+    path = shortest_path(source, target, mode=args.mode, stats=stats)
 
     if path is None:
         print("Not connected.")
@@ -87,50 +280,496 @@ def main():
             movie = movies[path[i + 1][0]]["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
+    if args.stats == "-":
+        print(json.dumps(stats.as_dict(), indent=2))
+    elif args.stats is not None:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats.as_dict(), f, indent=2)
+
 
-def shortest_path(source, target) -> list:
+def shortest_path(source, target, mode="bfs", stats=None) -> list:
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `mode` selects the search: "bfs" grows one frontier from the source,
+    "bidirectional" grows the smaller of two frontiers from both ends,
+    and "alt" runs A* guided by the landmark index.
+    All return a path of the same (shortest) length. When the tree cache
+    is enabled (see `enable_tree_cache`), it answers instead, whatever
+    the mode.
+
+    If `stats` is a SearchStats, it is filled in with counters and timings
+    for this search.
+
     If no possible path, returns None.
     """
+    if stats is None:
+        return _shortest_path(source, target, mode, None)
+    stats.start(mode)
+    path = _shortest_path(source, target, mode, stats)
+    stats.finish(path)
+    return path
+
 
-    if source == target:
-        return []
+def _shortest_path(source, target, mode, stats):
+    if component_index is not None and not _connected(source, target):
+        return None
 
-    source_node = Node(source, None, None)
-    # To find the shortest path, I'll use BFS then.
-    queue_frontier = QueueFrontier()
-    queue_frontier.add(source_node)
-    explored_nodes = set()
+    if tree_cache is not None:
+        # The cached trees override `mode`.
+        if stats is not None:
+            stats.mode = "tree_cache"
+        path = tree_cache.path(graph.person_index[source],
+                               graph.person_index[target], stats)
+        return None if path is None else graph.path_ids(path)
 
-    # [(1, 2), (3, 4)]:
-    # the source starred in movie 1 with person 2,
-    # person 2 starred in movie 3 with person 4,
-    # and person 4 is the target.
-    while True:
-        if queue_frontier.empty():
+    if mode == "alt":
+        landmarks = _landmarks()
+        if landmarks is None:
+            raise ValueError("alt mode needs load_data(num_landmarks=...)")
+        source_index = graph.person_index[source]
+        target_index = graph.person_index[target]
+        lower, upper = landmarks.bounds(source_index, target_index)
+        if lower is None:
             return None
+        path = a_star_search(source_index, target_index, graph.neighbors,
+                             landmarks.heuristic_to(target_index), stats)
+        return None if path is None else graph.path_ids(path)
+
+    if graph is not None:
+        path = _search(graph.person_index[source], graph.person_index[target],
+                       mode, graph.neighbors, stats)
+        return None if path is None else graph.path_ids(path)
+    return _search(source, target, mode, neighbors_for_person, stats)
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, one at a time, in no particular order.
+
+    Yields nothing if they are not connected.
+    """
+    dag = _shortest_path_dag(source, target)
+    if dag is None:
+        return
+    for path in dag:
+        yield path if graph is None else graph.path_ids(path)
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of distinct shortest paths between two person_ids,
+    without building them, or 0 if they are not connected.
+
+    Paths that pass through the same people in different shared movies
+    count separately, as all_shortest_paths yields each of them.
+    """
+    dag = _shortest_path_dag(source, target)
+    return 0 if dag is None else dag.count()
+
+
+def _shortest_path_dag(source, target):
+    if component_index is not None and not _connected(source, target):
+        return None
+    if graph is not None:
+        return shortest_path_dag(graph.person_index[source],
+                                 graph.person_index[target], graph.neighbors)
+    return shortest_path_dag(source, target, neighbors_for_person)
+
+
+def enable_tree_cache(max_bytes):
+    """
+    Makes shortest_path answer from cached BFS trees of recent sources,
+    keeping at most `max_bytes` of parent arrays. Needs the compact graph.
+
+    Returns the BFSTreeCache, whose hits and misses can be inspected.
+    """
+    global tree_cache
+
+    if graph is None:
+        raise ValueError("the tree cache needs load_data(compact=True)")
+    tree_cache = BFSTreeCache(graph, max_bytes)
+    return tree_cache
+
+
+def degrees_of_separation(source, target, mode="bidirectional"):
+    """
+    Returns the number of degrees of separation between two person_ids,
+    or None if they are not connected.
+
+    When the landmark bounds already agree, the answer comes straight from
+    the landmark index without searching the graph.
+    """
+    if component_index is not None and not _connected(source, target):
+        return None
+    landmarks = _landmarks()
+    if landmarks is not None:
+        lower, upper = landmarks.bounds(graph.person_index[source],
+                                        graph.person_index[target])
+        if lower is None:
+            return None
+        if lower == upper:
+            return lower
+        mode = "alt"
+    path = shortest_path(source, target, mode=mode)
+    return None if path is None else len(path)
+
+
+def component_sizes():
+    """
+    Returns a dict mapping each connected component size to the number
+    of components of that size. Needs load_data(components=True).
+    """
+    global component_index
+
+    if component_index is None:
+        raise ValueError("component sizes need load_data(components=True)")
+    if component_index.stale:
+        # Removals may have split components; relabel from scratch.
+        if graph is not None:
+            component_index = ComponentIndex.from_graph(graph)
+        else:
+            component_index = ComponentIndex.from_dicts(people, movies)
+    return component_index.size_histogram()
+
+
+def _connected(source, target):
+    if graph is not None:
+        return component_index.connected(graph.person_index[source],
+                                         graph.person_index[target])
+    return component_index.connected(source, target)
+
+
+def _search(source, target, mode, neighbors, stats=None):
+    """
+    Runs the search selected by `mode` over the given neighbors function.
+    """
+    if mode == "bfs":
+        return breadth_first_search(source, target, neighbors, stats)
+    if mode == "bidirectional":
+        return bidirectional_search(source, target, neighbors, stats)
+    raise ValueError(f"unknown search mode: {mode}")
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person, or updates the name and birth of a known person_id,
+    keeping names and any indexes consistent.
+    """
+    if graph is not None:
+        person = graph.person_index.get(person_id)
+        if person is not None:
+            _unindex_name(graph.person_names[person], person_id)
+        index = graph.add_person(person_id, name, birth)
+        if person is None:
+            _person_added(index)
+    elif person_id in people:
+        _unindex_name(people[person_id]["name"], person_id)
+        people[person_id]["name"] = name
+        people[person_id]["birth"] = birth
+    else:
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        if component_index is not None:
+            component_index.add_person(person_id)
+    _index_name(name, person_id)
+
+
+def remove_person(person_id):
+    """
+    Removes a person and every movie credit they have.
+    """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        name = graph.person_names[person]
+        graph.remove_person(person)
+    else:
+        person = people.pop(person_id)
+        name = person["name"]
+        for movie_id in person["movies"]:
+            if movie_id in movies:
+                movies[movie_id]["stars"].discard(person_id)
+    _unindex_name(name, person_id)
+    _graph_changed(removal=True)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie, or updates the title and year of a known movie_id.
+    """
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+    elif movie_id in movies:
+        movies[movie_id]["title"] = title
+        movies[movie_id]["year"] = year
+    else:
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def remove_movie(movie_id):
+    """
+    Removes a movie and every star credit in it.
+    """
+    if graph is not None:
+        graph.remove_movie(graph.movie_index[movie_id])
+    else:
+        for person_id in movies.pop(movie_id)["stars"]:
+            people[person_id]["movies"].discard(movie_id)
+    _graph_changed(removal=True)
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie. Both must already exist.
+    """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        movie = graph.movie_index[movie_id]
+        cast = list(graph.people_for_movie(movie))
+        graph.add_star(person, movie)
+    else:
+        person = person_id
+        cast = list(movies[movie_id]["stars"])
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+    if component_index is not None:
+        component_index.add_star(person, cast)
+    _graph_changed()
+
+
+def remove_star(person_id, movie_id):
+    """
+    Removes a person's credit in a movie.
+    """
+    if graph is not None:
+        graph.remove_star(graph.person_index[person_id],
+                          graph.movie_index[movie_id])
+    else:
+        people[person_id]["movies"].discard(movie_id)
+        movies[movie_id]["stars"].discard(person_id)
+    _graph_changed(removal=True)
+
+
+def apply_delta(records):
+    """
+    Applies update records, as written by delta.append_delta, in order.
+    """
+    for record in records:
+        validate(record)
+        operation = record["op"]
+        UPDATES[operation](*(record[field] for field in OPERATIONS[operation]))
+
+
+def apply_delta_file(path, offset=0):
+    """
+    Applies the records appended to a delta file since byte `offset`
+    and returns the offset to resume from next time.
+    """
+    records, offset = read_delta(path, offset)
+    apply_delta(records)
+    return offset
+
+
+def _index_name(name, person_id):
+    name = name.lower()
+    if isinstance(names, dict):
+        names.setdefault(name, set()).add(person_id)
+    else:
+        names.add(name, person_id)
+    if name_index is not None:
+        name_index.add(name)
+
+
+def _unindex_name(name, person_id):
+    name = name.lower()
+    if isinstance(names, dict):
+        person_ids = names.get(name)
+        if person_ids is not None:
+            person_ids.discard(person_id)
+            if not person_ids:
+                del names[name]
+    else:
+        names.discard(name, person_id)
+    if name_index is not None and name not in names:
+        name_index.discard(name)
+
+
+def _landmarks():
+    """
+    Returns the landmark index, rebuilding it if updates have dropped it,
+    or None if load_data was not asked for landmarks.
+    """
+    global landmark_index
+
+    if landmark_index is None and landmark_count:
+        landmark_index = LandmarkIndex.build(graph, landmark_count)
+    return landmark_index
+
+
+def _person_added(person):
+    """
+    Extends the indexes over the compact graph to a new person index.
+    A new person has no movies yet, so no existing distance changes.
+    """
+    if component_index is not None:
+        component_index.add_person(person)
+    if landmark_index is not None:
+        landmark_index.add_person(person)
+
+
+def _graph_changed(removal=False):
+    """
+    Drops or updates the indexes that a change to the stars, or a
+    removal, invalidates. Renames and people or movies with no stars
+    yet leave every path as it was, so they do not call this.
+    """
+    global landmark_index
+
+    # Landmark distances and cached trees describe the old graph. The
+    # landmarks are rebuilt when next needed (see _landmarks).
+    landmark_index = None
+    if tree_cache is not None:
+        tree_cache.clear()
+    if removal and component_index is not None:
+        component_index.mark_stale()
+
+
+UPDATES = {
+    "add_person": add_person,
+    "remove_person": remove_person,
+    "add_movie": add_movie,
+    "remove_movie": remove_movie,
+    "add_star": add_star,
+    "remove_star": remove_star,
+}
+
+
+def run_batch(lines, output, mode="bfs", workers=1, loader=None,
+              with_stats=False, fuzzy=False):
+    """
+    Answers one query per line of `lines`, each a source and target
+    (names or person IDs) separated by a tab, and writes one JSON
+    object per query to `output`, in input order.
+
+    With more than one worker, queries are fanned out over a process pool.
+    Forked workers share the already loaded graph copy-on-write; `loader`
+    holds the keyword arguments for load_data, used by workers that start
+    without a copy of it.
+
+    With `with_stats`, each result also carries the search statistics.
+    With `fuzzy`, names that match nobody exactly resolve to the closest
+    name if that is unambiguous.
+    """
+    options = {"mode": mode, "with_stats": with_stats, "fuzzy": fuzzy}
+    queries = (line.rstrip("\n").split("\t") for line in lines if line.strip())
+    tasks = ((query, options) for query in queries)
+
+    if workers <= 1:
+        for result in map(_answer_task, tasks):
+            output.write(json.dumps(result) + "\n")
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(workers, _init_worker, (loader,)) as pool:
+        for result in pool.imap(_answer_task, tasks, BATCH_CHUNK_SIZE):
+            output.write(json.dumps(result) + "\n")
+
+
+def answer_query(source, target, mode="bfs", with_stats=False, fuzzy=False):
+    """
+    Resolves a source and target (names or person IDs) and returns a
+    JSON-serializable dict with their degrees of separation and path.
+    """
+    result = {"source": source, "target": target}
+    source_id, error = resolve_person(source, fuzzy)
+    if error is None:
+        target_id, error = resolve_person(target, fuzzy)
+    if error is not None:
+        result["error"] = error
+        return result
+
+    stats = SearchStats() if with_stats else None
+    path = shortest_path(source_id, target_id, mode=mode, stats=stats)
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    if stats is not None:
+        result["stats"] = stats.as_dict()
+    return result
+
+
+def resolve_person(value, fuzzy=False):
+    """
+    Returns (person_id, error) for a person ID or an unambiguous name,
+    without prompting.
+
+    With `fuzzy`, a name that matches nobody resolves to the closest
+    indexed name if exactly one person has it.
+    """
+    if value in people:
+        return value, None
+    person_ids = names.get(value.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids)), None
+    if person_ids:
+        return None, f"Ambiguous name: {value} ({', '.join(sorted(person_ids))})"
+
+    suggestions = suggest_names(value)
+    if (fuzzy and suggestions and len(suggestions[0]["person_ids"]) == 1
+            and (len(suggestions) == 1
+                 or suggestions[1]["distance"] > suggestions[0]["distance"])):
+        return suggestions[0]["person_ids"][0], None
+    if suggestions:
+        return None, (f"Person not found: {value} (did you mean: "
+                      f"{', '.join(s['name'] for s in suggestions)}?)")
+    return None, f"Person not found: {value}"
+
+
+def suggest_names(query, max_distance=2, limit=5):
+    """
+    Returns up to `limit` names within `max_distance` typos of `query`,
+    closest first, as dicts of lowercased name, distance and person_ids.
+    """
+    index = _name_index()
+    return [
+        {"name": name, "distance": distance,
+         "person_ids": sorted(names.get(name, set()))}
+        for name, distance in index.fuzzy(query, max_distance, limit)
+    ]
+
+
+def complete_name(prefix, limit=10):
+    """
+    Returns up to `limit` lowercased names starting with `prefix`.
+    """
+    return _name_index().prefix(prefix, limit)
+
+
+def _name_index():
+    global name_index
+
+    if name_index is None:
+        name_index = NameIndex(names)
+    return name_index
+
 
-        current_exploring_node = queue_frontier.remove()
-        explored_nodes.add(current_exploring_node.state)
-        # neighbors_for_person -> (movie_id, person_id)
-        for movie, person in neighbors_for_person(
-                             current_exploring_node.state):
-            if person == target:
-                path = [(movie, person)]
-                while current_exploring_node.parent:
-                    path.append((current_exploring_node.action,
-                                 current_exploring_node.state))
-                    current_exploring_node = current_exploring_node.parent
+def _answer_task(task):
+    query, options = task
+    if len(query) != 2:
+        return {"query": query, "error": "Expected source<TAB>target"}
+    return answer_query(query[0].strip(), query[1].strip(), **options)
 
-                path.reverse()
-                return path
 
-            if (queue_frontier.contains_state(person) is False
-                    and person not in explored_nodes):
-                queue_frontier.add(Node(person, current_exploring_node, movie))
+def _init_worker(loader):
+    # Forked workers inherit the parent's graph; others load their own copy.
+    if loader is not None and graph is None and not people:
+        # Pool workers cannot start pools of their own.
+        load_data(**dict(loader, workers=1))
 
 
 def person_id_for_name(name):
@@ -140,6 +779,10 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = suggest_names(name)
+        if suggestions:
+            print("Did you mean: "
+                  + ", ".join(s["name"] for s in suggestions) + "?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -0,0 +1,53 @@
+import json
+
+# Fields each kind of update record carries, besides "op"
+OPERATIONS = {
+    "add_person": ("id", "name", "birth"),
+    "remove_person": ("id",),
+    "add_movie": ("id", "title", "year"),
+    "remove_movie": ("id",),
+    "add_star": ("person_id", "movie_id"),
+    "remove_star": ("person_id", "movie_id"),
+}
+
+
+def append_delta(path, records):
+    """
+    Appends update records to the delta file at `path`, one JSON object
+    per line, e.g. {"op": "add_star", "person_id": "102", "movie_id": "104257"}.
+    """
+    lines = []
+    for record in records:
+        validate(record)
+        lines.append(json.dumps(record) + "\n")
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def read_delta(path, offset=0):
+    """
+    Reads the records appended to the delta file at `path` since byte
+    `offset`. Returns (records, offset) where the new offset is where the
+    next read should start; a partly written last line is left for it.
+    """
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                record = json.loads(line)
+                validate(record)
+                records.append(record)
+    return records, offset
+
+
+def validate(record):
+    fields = OPERATIONS.get(record.get("op"))
+    if fields is None:
+        raise ValueError(f"unknown delta operation: {record.get('op')}")
+    missing = [field for field in fields if field not in record]
+    if missing:
+        raise ValueError(f"{record['op']} record is missing {', '.join(missing)}")
@@ -0,0 +1,120 @@
+import argparse
+import csv
+import os
+import random
+
+FIRST_NAMES = [
+    "Alex", "Ava", "Ben", "Chloe", "Dan", "Emma", "Finn", "Grace", "Hugo",
+    "Isla", "Jack", "Kate", "Leo", "Mia", "Noah", "Olivia", "Paul", "Quinn",
+    "Rosa", "Sam", "Tara", "Uma", "Victor", "Wendy", "Xavier", "Yara", "Zoe",
+]
+LAST_NAMES = [
+    "Adams", "Baker", "Clark", "Davis", "Evans", "Fisher", "Garcia", "Hall",
+    "Ito", "Jones", "Kim", "Lopez", "Miller", "Nguyen", "Owens", "Patel",
+    "Quinn", "Reed", "Smith", "Taylor", "Usman", "Vargas", "Walker", "Young",
+]
+
+# Exponents of the power laws for cast sizes and for how many movies
+# a person appears in (smaller is heavier-tailed).
+CAST_EXPONENT = 2.2
+POPULARITY_EXPONENT = 2.0
+MAX_CAST = 200
+# Average number of movies per person, used to size the people table
+MOVIES_PER_PERSON = 2.5
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic people/movies/stars dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("--stars", type=float, default=1e5,
+                        help="approximate number of rows in stars.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(args.directory, int(args.stars), args.seed)
+    print("Wrote {people} people, {movies} movies and {stars} stars "
+          "to {directory}".format(directory=args.directory, **counts))
+
+
+def generate(directory, num_stars, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `num_stars`
+    star rows to `directory`, in the layout degrees.load_data reads.
+
+    Cast sizes follow a power law (most movies have a handful of stars,
+    a few have huge ensembles), and stars are drawn with power-law
+    popularity, so a few people appear in many movies.
+
+    Returns the number of people, movies and stars written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    num_people = max(2, int(num_stars / MOVIES_PER_PERSON))
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            # Suffixes keep most names unique while leaving some ambiguous.
+            if rng.random() < 0.9:
+                name += f" {_suffix(i)}"
+            birth = str(rng.randint(1900, 2005)) if rng.random() < 0.8 else ""
+            writer.writerow([_person_id(i), name, birth])
+
+    num_movies = 0
+    stars = 0
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as movies_file, \
+            open(os.path.join(directory, "stars.csv"), "w",
+                 encoding="utf-8", newline="") as stars_file:
+        movies_writer = csv.writer(movies_file)
+        stars_writer = csv.writer(stars_file)
+        movies_writer.writerow(["id", "title", "year"])
+        stars_writer.writerow(["person_id", "movie_id"])
+        while stars < num_stars:
+            movie_id = _movie_id(num_movies)
+            movies_writer.writerow(
+                [movie_id, f"Movie {num_movies}", rng.randint(1920, 2024)])
+            cast = {_popular_person(rng, num_people)
+                    for _ in range(_cast_size(rng))}
+            for person in cast:
+                stars_writer.writerow([_person_id(person), movie_id])
+            stars += len(cast)
+            num_movies += 1
+
+    return {"people": num_people, "movies": num_movies, "stars": stars}
+
+
+def _cast_size(rng):
+    size = int(rng.paretovariate(CAST_EXPONENT - 1))
+    return min(size, MAX_CAST)
+
+
+def _popular_person(rng, num_people):
+    # Raising a uniform draw to a power skews it towards low ranks,
+    # so people with small indices appear in the most movies.
+    return int(num_people * rng.random() ** POPULARITY_EXPONENT)
+
+
+def _person_id(i):
+    return str(100000 + i)
+
+
+def _movie_id(i):
+    return str(5000000 + i)
+
+
+def _suffix(i):
+    letters = ""
+    while True:
+        i, r = divmod(i, 26)
+        letters += chr(ord("A") + r)
+        if i == 0:
+            return letters
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,617 @@
+import csv
+from array import array
+from collections.abc import Mapping, Sequence
+
+from ingest import read_star_edges
+
+# Typecodes for the CSR arrays: offsets can exceed 2**31 on big graphs,
+# while a person or movie index always fits in 32 bits.
+OFFSET_TYPE = "q"
+INDEX_TYPE = "i"
+
+
+class CompactGraph():
+    """
+    The people/movies graph with IDs interned to dense ints.
+
+    Person `i` starred in movies
+    `person_movies[person_offsets[i]:person_offsets[i + 1]]`, and movie `j`
+    has stars `movie_people[movie_offsets[j]:movie_offsets[j + 1]]`
+    (the usual CSR offset/index layout).
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        # Updates since loading, see add_person and friends
+        self.overlay = None
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds the compact graph from the `people` and `movies` dicts
+        filled in by `degrees.load_data`.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+        for i, person_id in enumerate(person_ids):
+            for movie_id in people[person_id]["movies"]:
+                if movie_id in movie_index:
+                    edge_people.append(i)
+                    edge_movies.append(movie_index[movie_id])
+
+        return cls._from_edges(
+            person_ids,
+            [people[pid]["name"] for pid in person_ids],
+            [people[pid]["birth"] for pid in person_ids],
+            movie_ids,
+            [movies[mid]["title"] for mid in movie_ids],
+            [movies[mid]["year"] for mid in movie_ids],
+            edge_people, edge_movies, movie_index=movie_index)
+
+    @classmethod
+    def from_csv(cls, directory, workers=1):
+        """
+        Builds the compact graph straight from the CSV files, without
+        going through the per-person and per-movie sets.
+
+        Star rows naming an unknown person or movie are dropped. With more
+        than one worker, stars.csv is parsed by a process pool.
+        """
+        person_ids, person_names, person_births = [], [], []
+        person_index = {}
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                _intern(row["id"], person_index, person_ids,
+                        (person_names, row["name"]),
+                        (person_births, row["birth"]))
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        movie_index = {}
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                _intern(row["id"], movie_index, movie_ids,
+                        (movie_titles, row["title"]),
+                        (movie_years, row["year"]))
+
+        edge_people, edge_movies, _ = read_star_edges(
+            f"{directory}/stars.csv", person_index, movie_index, workers)
+
+        return cls._from_edges(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            edge_people, edge_movies,
+            person_index=person_index, movie_index=movie_index)
+
+    @classmethod
+    def _from_edges(cls, person_ids, person_names, person_births,
+                    movie_ids, movie_titles, movie_years,
+                    edge_people, edge_movies,
+                    person_index=None, movie_index=None):
+        person_offsets, person_movies = build_csr(
+            edge_people, edge_movies, len(person_ids))
+
+        # Derive the movie side from the deduplicated person side.
+        edge_people = array(INDEX_TYPE)
+        for i in range(len(person_ids)):
+            edge_people.extend(
+                [i] * (person_offsets[i + 1] - person_offsets[i]))
+        movie_offsets, movie_people = build_csr(
+            person_movies, edge_people, len(movie_ids))
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_people,
+                   person_index=person_index, movie_index=movie_index)
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def movies_for_person(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        if self.overlay is not None:
+            return self.overlay.movies_for_person(person)
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def people_for_movie(self, movie):
+        """
+        Returns the person indices that starred in a movie index.
+        """
+        if self.overlay is not None:
+            return self.overlay.people_for_movie(movie)
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person index.
+        """
+        if self.overlay is not None:
+            return [(movie, neighbor)
+                    for movie in self.overlay.movies_for_person(person)
+                    for neighbor in self.overlay.people_for_movie(movie)]
+
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        neighbors = []
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbors.append((movie, movie_people[j]))
+        return neighbors
+
+    def distances_from(self, person, unreachable):
+        """
+        Returns an array of BFS distances (in people) from a person index
+        to every person index, with `unreachable` for people in other
+        components.
+        """
+        movies_for_person, people_for_movie = self._adjacency()
+        distances = array("H", [unreachable]) * self.num_people
+        # Every star of a movie is reached together, so each movie
+        # only needs to be expanded once.
+        expanded_movies = bytearray(self.num_movies)
+
+        distances[person] = 0
+        layer = [person]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for current in layer:
+                for movie in movies_for_person(current):
+                    if expanded_movies[movie]:
+                        continue
+                    expanded_movies[movie] = 1
+                    for neighbor in people_for_movie(movie):
+                        if distances[neighbor] == unreachable:
+                            distances[neighbor] = depth
+                            next_layer.append(neighbor)
+            layer = next_layer
+        return distances
+
+    def bfs_tree(self, person):
+        """
+        Returns (parent_people, parent_movies) arrays of a BFS tree rooted
+        at a person index: each reached person's parent in the tree and
+        the movie they share, or -1 for the root and unreached people.
+        """
+        movies_for_person, people_for_movie = self._adjacency()
+        parent_people = array(INDEX_TYPE, [-1]) * self.num_people
+        parent_movies = array(INDEX_TYPE, [-1]) * self.num_people
+        expanded_movies = bytearray(self.num_movies)
+
+        layer = [person]
+        while layer:
+            next_layer = []
+            for current in layer:
+                for movie in movies_for_person(current):
+                    if expanded_movies[movie]:
+                        continue
+                    expanded_movies[movie] = 1
+                    for neighbor in people_for_movie(movie):
+                        if parent_movies[neighbor] == -1 and neighbor != person:
+                            parent_people[neighbor] = current
+                            parent_movies[neighbor] = movie
+                            next_layer.append(neighbor)
+            layer = next_layer
+        return parent_people, parent_movies
+
+    def _adjacency(self):
+        """
+        Returns (movies_for_person, people_for_movie) functions, bound
+        straight to the CSR arrays when there are no updates to merge in.
+        """
+        if self.overlay is not None:
+            return (self.overlay.movies_for_person,
+                    self.overlay.people_for_movie)
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+
+        def movies_for_person(person):
+            return person_movies[person_offsets[person]:person_offsets[person + 1]]
+
+        def people_for_movie(movie):
+            return movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]
+
+        return movies_for_person, people_for_movie
+
+    def has_person(self, person):
+        return self.overlay is None or person not in self.overlay.removed_people
+
+    def has_movie(self, movie):
+        return self.overlay is None or movie not in self.overlay.removed_movies
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person, or updates their name and birth if the ID is
+        already known. Returns the person index.
+        """
+        overlay = self._overlay()
+        return overlay.add(person_id, self.person_index, self.person_ids,
+                           overlay.removed_people,
+                           (self.person_names, name), (self.person_births, birth))
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie, or updates its title and year if the ID is
+        already known. Returns the movie index.
+        """
+        overlay = self._overlay()
+        return overlay.add(movie_id, self.movie_index, self.movie_ids,
+                           overlay.removed_movies,
+                           (self.movie_titles, title), (self.movie_years, year))
+
+    def remove_person(self, person):
+        overlay = self._overlay()
+        for movie in list(overlay.movies_for_person(person)):
+            overlay.unlink(person, movie)
+        overlay.removed_people.add(person)
+        self.person_index.discard(self.person_ids[person])
+
+    def remove_movie(self, movie):
+        overlay = self._overlay()
+        for person in list(overlay.people_for_movie(movie)):
+            overlay.unlink(person, movie)
+        overlay.removed_movies.add(movie)
+        self.movie_index.discard(self.movie_ids[movie])
+
+    def add_star(self, person, movie):
+        self._overlay().link(person, movie)
+
+    def remove_star(self, person, movie):
+        self._overlay().unlink(person, movie)
+
+    def compacted(self):
+        """
+        Returns a new CompactGraph with the updates made since loading folded
+        back into plain CSR arrays. Removed people and movies are dropped,
+        so indices change.
+        """
+        if self.overlay is None:
+            return self
+        people = [i for i in range(self.num_people) if self.has_person(i)]
+        movies = [j for j in range(self.num_movies) if self.has_movie(j)]
+        new_movie = {j: k for k, j in enumerate(movies)}
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+        for new_person, person in enumerate(people):
+            for movie in self.movies_for_person(person):
+                edge_people.append(new_person)
+                edge_movies.append(new_movie[movie])
+        return self._from_edges(
+            [self.person_ids[i] for i in people],
+            [self.person_names[i] for i in people],
+            [self.person_births[i] for i in people],
+            [self.movie_ids[j] for j in movies],
+            [self.movie_titles[j] for j in movies],
+            [self.movie_years[j] for j in movies],
+            edge_people, edge_movies)
+
+    def _overlay(self):
+        """
+        Returns the overlay that records updates on top of the CSR arrays,
+        creating it on the first update.
+        """
+        if self.overlay is None:
+            self.person_ids = OverlayList(self.person_ids)
+            self.person_names = OverlayList(self.person_names)
+            self.person_births = OverlayList(self.person_births)
+            self.movie_ids = OverlayList(self.movie_ids)
+            self.movie_titles = OverlayList(self.movie_titles)
+            self.movie_years = OverlayList(self.movie_years)
+            self.person_index = OverlayIndex(self.person_index)
+            self.movie_index = OverlayIndex(self.movie_index)
+            self.overlay = GraphOverlay(self)
+        return self.overlay
+
+    def path_ids(self, path):
+        """
+        Converts a path of (movie, person) indices back to
+        (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` dict over a CompactGraph, mapping person_ids to
+    a dictionary of: name, birth, movies (a set of movie_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        i = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[i],
+            "birth": graph.person_births[i],
+            "movies": {graph.movie_ids[m] for m in graph.movies_for_person(i)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        graph = self.graph
+        if graph.overlay is None:
+            return iter(graph.person_ids)
+        return (graph.person_ids[i] for i in range(graph.num_people)
+                if graph.has_person(i))
+
+    def __len__(self):
+        graph = self.graph
+        if graph.overlay is None:
+            return graph.num_people
+        return graph.num_people - len(graph.overlay.removed_people)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` dict over a CompactGraph, mapping movie_ids to
+    a dictionary of: title, year, stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        j = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[j],
+            "year": graph.movie_years[j],
+            "stars": {graph.person_ids[p] for p in graph.people_for_movie(j)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        graph = self.graph
+        if graph.overlay is None:
+            return iter(graph.movie_ids)
+        return (graph.movie_ids[j] for j in range(graph.num_movies)
+                if graph.has_movie(j))
+
+    def __len__(self):
+        graph = self.graph
+        if graph.overlay is None:
+            return graph.num_movies
+        return graph.num_movies - len(graph.overlay.removed_movies)
+
+
+class GraphOverlay():
+    """
+    Star links added and removed since a CompactGraph was loaded, kept
+    beside its CSR arrays so that updates do not rebuild them.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.base_people = len(graph.person_offsets) - 1
+        self.base_movies = len(graph.movie_offsets) - 1
+        self.added_movies = {}
+        self.added_people = {}
+        # (person, movie) links from the CSR arrays that have been removed
+        self.removed_stars = set()
+        self.removed_people = set()
+        self.removed_movies = set()
+
+    def movies_for_person(self, person):
+        graph = self.graph
+        movies = []
+        if person < self.base_people:
+            movies = graph.person_movies[
+                graph.person_offsets[person]:graph.person_offsets[person + 1]]
+            if self.removed_stars:
+                movies = [movie for movie in movies
+                          if (person, movie) not in self.removed_stars]
+        added = self.added_movies.get(person)
+        if added:
+            movies = list(movies) + sorted(added)
+        return movies
+
+    def people_for_movie(self, movie):
+        graph = self.graph
+        people = []
+        if movie < self.base_movies:
+            people = graph.movie_people[
+                graph.movie_offsets[movie]:graph.movie_offsets[movie + 1]]
+            if self.removed_stars:
+                people = [person for person in people
+                          if (person, movie) not in self.removed_stars]
+        added = self.added_people.get(movie)
+        if added:
+            people = list(people) + sorted(added)
+        return people
+
+    def add(self, key, index, keys, removed, *columns):
+        i = index.get(key)
+        if i is None:
+            i = len(keys)
+            keys.append(key)
+            for column, value in columns:
+                column.append(value)
+            index.add(key, i)
+        else:
+            for column, value in columns:
+                column[i] = value
+        removed.discard(i)
+        return i
+
+    def link(self, person, movie):
+        if (person, movie) in self.removed_stars:
+            self.removed_stars.discard((person, movie))
+        elif movie not in self.movies_for_person(person):
+            self.added_movies.setdefault(person, set()).add(movie)
+            self.added_people.setdefault(movie, set()).add(person)
+
+    def unlink(self, person, movie):
+        if movie in self.added_movies.get(person, ()):
+            self.added_movies[person].discard(movie)
+            self.added_people[movie].discard(person)
+        elif movie in self.movies_for_person(person):
+            self.removed_stars.add((person, movie))
+
+
+class OverlayList(Sequence):
+    """
+    A list that can be appended to and updated on top of a read-only
+    sequence, such as a snapshot's string table.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.base_size = len(base)
+        self.changed = {}
+        self.extra = []
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i >= self.base_size:
+            return self.extra[i - self.base_size]
+        return self.changed.get(i, self.base[i]) if self.changed else self.base[i]
+
+    def __setitem__(self, i, value):
+        if i >= self.base_size:
+            self.extra[i - self.base_size] = value
+        else:
+            self.changed[i] = value
+
+    def __len__(self):
+        return self.base_size + len(self.extra)
+
+    def append(self, value):
+        self.extra.append(value)
+
+
+class OverlayIndex(Mapping):
+    """
+    An ID-to-index mapping that can gain and lose keys on top of a
+    read-only mapping, such as a snapshot's sorted lookup.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.added = {}
+        self.removed = set()
+
+    def get(self, key, default=None):
+        if key in self.added:
+            return self.added[key]
+        if key in self.removed:
+            return default
+        return self.base.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        for key in self.base:
+            if key not in self.removed and key not in self.added:
+                yield key
+        yield from self.added
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def add(self, key, value):
+        self.added[key] = value
+        self.removed.discard(key)
+
+    def discard(self, key):
+        self.added.pop(key, None)
+        self.removed.add(key)
+
+
+def build_csr(sources, targets, count):
+    """
+    Groups `targets` by `sources` into CSR (offsets, indices) arrays for
+    `count` rows. Each row is sorted and duplicate entries are dropped.
+    """
+    offsets = array(OFFSET_TYPE, [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    indices = array(INDEX_TYPE, [0]) * len(targets)
+    positions = offsets[:-1]
+    for source, target in zip(sources, targets):
+        indices[positions[source]] = target
+        positions[source] += 1
+
+    # Sort and deduplicate each row, compacting the index array in place.
+    write = 0
+    start = 0
+    for i in range(count):
+        end = offsets[i + 1]
+        row = sorted(set(indices[start:end]))
+        indices[write:write + len(row)] = array(INDEX_TYPE, row)
+        offsets[i] = write
+        write += len(row)
+        start = end
+    offsets[count] = write
+    del indices[write:]
+    return offsets, indices
+
+
+def _intern(key, index, keys, *columns):
+    """
+    Assigns `key` the next dense int, or overwrites its columns if it was
+    already seen (later CSV rows win, as they do for the dicts).
+    """
+    i = index.get(key)
+    if i is None:
+        index[key] = len(keys)
+        keys.append(key)
+        for column, value in columns:
+            column.append(value)
+    else:
+        for column, value in columns:
+            column[i] = value
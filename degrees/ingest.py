@@ -0,0 +1,99 @@
+import csv
+import multiprocessing
+import os
+from array import array
+
+# Target size of the byte range each worker parses at a time
+CHUNK_BYTES = 16 * 2 ** 20
+
+# ID-to-index dicts for the workers, inherited when the pool forks
+_indexes = None
+
+
+def read_star_edges(path, person_index, movie_index, workers=1):
+    """
+    Parses a stars.csv file into integer edge arrays, splitting it into
+    byte-range chunks parsed by a pool of `workers` processes.
+
+    Returns (edge_people, edge_movies, dangling): parallel arrays with
+    the person and movie index of every row naming a known person and
+    a known movie, in file order, and a list of (person index, movie_id)
+    for rows naming a known person but an unknown movie.
+    Rows naming an unknown person are dropped.
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig")]))
+        data_start = f.tell()
+        size = f.seek(0, os.SEEK_END)
+    columns = (header.index("person_id"), header.index("movie_id"))
+
+    chunk_bytes = max(1, min(CHUNK_BYTES, (size - data_start) // (workers * 4) + 1))
+    tasks = [(path, start, min(start + chunk_bytes, size), columns)
+             for start in range(data_start, size, chunk_bytes)]
+
+    global _indexes
+    _indexes = (person_index, movie_index)
+    try:
+        if workers <= 1 or len(tasks) <= 1:
+            results = map(_parse_chunk, tasks)
+            return _merge(results)
+        if "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                return _merge(pool.imap(_parse_chunk, tasks))
+        with multiprocessing.Pool(workers, _init_worker, (_indexes,)) as pool:
+            return _merge(pool.imap(_parse_chunk, tasks))
+    finally:
+        _indexes = None
+
+
+def _merge(results):
+    edge_people = array("i")
+    edge_movies = array("i")
+    dangling = []
+    for people_bytes, movies_bytes, chunk_dangling in results:
+        edge_people.frombytes(people_bytes)
+        edge_movies.frombytes(movies_bytes)
+        dangling.extend(chunk_dangling)
+    return edge_people, edge_movies, dangling
+
+
+def _init_worker(indexes):
+    global _indexes
+    _indexes = indexes
+
+
+def _parse_chunk(task):
+    """
+    Parses the lines that start inside the byte range [start, end).
+    """
+    path, start, end, (person_column, movie_column) = task
+    person_index, movie_index = _indexes
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        if start > 0:
+            # Skip the tail of a line that started in the previous chunk.
+            f.seek(start - 1)
+            f.readline()
+        data = f.read(max(0, end - f.tell()))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    dangling = []
+    for row in csv.reader(data.decode("utf-8").splitlines()):
+        try:
+            person = person_index.get(row[person_column])
+            movie_id = row[movie_column]
+        except IndexError:
+            continue
+        if person is None:
+            continue
+        movie = movie_index.get(movie_id)
+        if movie is None:
+            dangling.append((person, movie_id))
+        else:
+            edge_people.append(person)
+            edge_movies.append(movie)
+    return edge_people.tobytes(), edge_movies.tobytes(), dangling
@@ -0,0 +1,110 @@
+import struct
+from array import array
+
+# Distance stored for people in a different component from the landmark
+UNREACHABLE = 0xFFFF
+
+# Magic, then the landmark and person counts
+HEADER = struct.Struct("<8sII")
+MAGIC = b"DEGLMK1\0"
+
+
+class LandmarkIndex():
+    """
+    BFS distances from a few landmark people to every person in a
+    CompactGraph, used for ALT (A*, landmarks, triangle inequality) bounds.
+
+    For any landmark L, |d(L, a) - d(L, b)| <= d(a, b) <= d(L, a) + d(L, b).
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Picks the `k` people with the most co-star slots as landmarks and
+        runs one BFS from each of them.
+        """
+        degree = [
+            sum(len(graph.people_for_movie(movie))
+                for movie in graph.movies_for_person(person))
+            for person in range(graph.num_people)
+        ]
+        landmarks = sorted(range(graph.num_people),
+                           key=degree.__getitem__, reverse=True)[:k]
+        distances = [graph.distances_from(landmark, UNREACHABLE)
+                     for landmark in landmarks]
+        return cls(array("i", landmarks), distances)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, k, num_people = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"not a landmark index: {path}")
+            landmarks = array("i")
+            landmarks.fromfile(f, k)
+            distances = []
+            for _ in range(k):
+                row = array("H")
+                row.fromfile(f, num_people)
+                distances.append(row)
+        return cls(landmarks, distances)
+
+    def save(self, path):
+        num_people = len(self.distances[0]) if self.distances else 0
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.landmarks), num_people))
+            self.landmarks.tofile(f)
+            for row in self.distances:
+                row.tofile(f)
+
+    def add_person(self, person):
+        """
+        Extends the distances to a new person index with no movies,
+        which no landmark reaches.
+        """
+        for row in self.distances:
+            while len(row) <= person:
+                row.append(UNREACHABLE)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the distance between two person
+        indices. Both are None if the landmarks prove they are not
+        connected; upper is None if no landmark reaches either of them.
+        """
+        lower = 0
+        upper = None
+        for row in self.distances:
+            a = row[source]
+            b = row[target]
+            if a == UNREACHABLE and b == UNREACHABLE:
+                continue
+            if a == UNREACHABLE or b == UNREACHABLE:
+                # The landmark reaches one of them but not the other.
+                return None, None
+            lower = max(lower, abs(a - b))
+            if upper is None or a + b < upper:
+                upper = a + b
+        return lower, upper
+
+    def heuristic_to(self, target):
+        """
+        Returns a consistent A* heuristic estimating the distance from a
+        person index to `target`.
+        """
+        rows = [(row, row[target]) for row in self.distances
+                if row[target] != UNREACHABLE]
+
+        def heuristic(person):
+            best = 0
+            for row, to_target in rows:
+                estimate = abs(row[person] - to_target)
+                if estimate > best:
+                    best = estimate
+            return best
+
+        return heuristic
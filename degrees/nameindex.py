@@ -0,0 +1,148 @@
+from array import array
+from bisect import bisect_left, insort
+
+# Length of the n-grams in the posting lists
+GRAM = 3
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup over a set of lowercased names.
+
+    Names are kept sorted, so a prefix is a contiguous run found by binary
+    search. Every name's padded trigrams are indexed in posting lists; a
+    name within edit distance k of the query must share all but 3k of
+    the query's trigrams, so only names in the rarest posting lists need
+    to be checked with a bounded edit-distance computation.
+
+    Posting lists hold a stable id per name, so names can be added and
+    discarded one at a time; a discarded name's id is left in its lists
+    and skipped.
+    """
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        # Name of each id, or None once discarded
+        self.id_names = list(self.names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        postings = {}
+        for i, name in enumerate(self.names):
+            for gram in _grams(name):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = array("i", (i,))
+                else:
+                    posting.append(i)
+        self.postings = postings
+
+    def add(self, name):
+        """
+        Adds a lowercased name, if it is not indexed already.
+        """
+        if name in self.ids:
+            return
+        i = len(self.id_names)
+        self.id_names.append(name)
+        self.ids[name] = i
+        insort(self.names, name)
+        for gram in _grams(name):
+            self.postings.setdefault(gram, array("i")).append(i)
+
+    def discard(self, name):
+        """
+        Removes a lowercased name, if it is indexed.
+        """
+        i = self.ids.pop(name, None)
+        if i is None:
+            return
+        self.id_names[i] = None
+        del self.names[bisect_left(self.names, name)]
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`, in sorted order.
+        """
+        prefix = prefix.lower()
+        names = self.names
+        result = []
+        i = bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix) and len(result) < limit:
+            result.append(names[i])
+            i += 1
+        return result
+
+    def fuzzy(self, query, max_distance=2, limit=10):
+        """
+        Returns up to `limit` (name, distance) pairs for names within
+        `max_distance` edits of `query`, closest first.
+
+        Names sharing no trigram with the query are not considered, so
+        very short queries only match near-exact names.
+        """
+        query = query.lower()
+        query_grams = set(_grams(query))
+        grams = [gram for gram in query_grams if gram in self.postings]
+        if not grams:
+            return []
+
+        # A match shares at least `needed` of the query's trigrams, so it
+        # appears in at least one of the rarest len(grams) - needed + 1 lists.
+        needed = max(1, len(query_grams) - GRAM * max_distance)
+        grams.sort(key=lambda gram: len(self.postings[gram]))
+        candidates = set()
+        for gram in grams[:max(1, len(grams) - needed + 1)]:
+            candidates.update(self.postings[gram])
+
+        matches = []
+        for i in candidates:
+            name = self.id_names[i]
+            if name is None or abs(len(name) - len(query)) > max_distance:
+                continue
+            # Cheap trigram count filter before the edit distance.
+            if len(query_grams.intersection(_grams(name))) < needed:
+                continue
+            distance = bounded_edit_distance(query, name, max_distance)
+            if distance is not None:
+                matches.append((distance, name))
+        matches.sort()
+        return [(name, distance) for distance, name in matches[:limit]]
+
+
+def bounded_edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between `a` and `b` if it is at most
+    `limit`, otherwise None.
+
+    Only cells within `limit` of the diagonal can stay under the limit, so
+    each row fills just that band, and the search stops as soon as every
+    cell of a row exceeds it.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def _grams(name):
+    padded = f"^{name}$"
+    return [padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)]
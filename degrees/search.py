@@ -0,0 +1,339 @@
+from util import Node, PriorityFrontier, QueueFrontier
+
+
+def breadth_first_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, growing a single frontier from the source.
+
+    `neighbors(state)` must return (action, state) pairs.
+    If `stats` is a SearchStats, the search records into it.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    source_node = Node(source, None, None)
+    # To find the shortest path, I'll use BFS then.
+    queue_frontier = QueueFrontier()
+    queue_frontier.add(source_node)
+    explored_nodes = set()
+    if stats is not None:
+        neighbors = stats.instrument(
+            neighbors, lambda: len(queue_frontier.frontier))
+
+    # [(1, 2), (3, 4)]:
+    # the source starred in movie 1 with person 2,
+    # person 2 starred in movie 3 with person 4,
+    # and person 4 is the target.
+    while True:
+        if queue_frontier.empty():
+            return None
+
+        current_exploring_node = queue_frontier.remove()
+        explored_nodes.add(current_exploring_node.state)
+        # neighbors -> (movie_id, person_id)
+        for movie, person in neighbors(current_exploring_node.state):
+            if person == target:
+                path = [(movie, person)]
+                while current_exploring_node.parent:
+                    path.append((current_exploring_node.action,
+                                 current_exploring_node.state))
+                    current_exploring_node = current_exploring_node.parent
+
+                path.reverse()
+                return path
+
+            if (queue_frontier.contains_state(person) is False
+                    and person not in explored_nodes):
+                queue_frontier.add(Node(person, current_exploring_node, movie))
+
+
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, searching from both ends at once.
+
+    `neighbors(state)` must return (action, state) pairs. The graph is
+    assumed to be undirected, so the same function is used to expand
+    the backward search from the target.
+    If `stats` is a SearchStats, the search records into it.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached state to (previous state, action) on its side.
+    # For the backward side "previous" is the state one step closer to the target.
+    forward_parents = {source: None}
+    backward_parents = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+    forward_depth = backward_depth = 0
+    if stats is not None:
+        neighbors = stats.instrument(
+            neighbors, lambda: len(forward_layer) + len(backward_layer),
+            track_layers=False)
+
+    while forward_layer and backward_layer:
+        # Always grow the smaller side, one whole layer at a time.
+        if len(forward_layer) <= len(backward_layer):
+            if stats is not None:
+                stats.start_layer("forward", forward_depth)
+                expanded = len(forward_layer)
+            forward_depth += 1
+            forward_layer, meeting = _expand_layer(
+                forward_layer, forward_parents, backward_parents, neighbors)
+            layer = forward_layer
+        else:
+            if stats is not None:
+                stats.start_layer("backward", backward_depth)
+                expanded = len(backward_layer)
+            backward_depth += 1
+            backward_layer, meeting = _expand_layer(
+                backward_layer, backward_parents, forward_parents, neighbors)
+            layer = backward_layer
+
+        if stats is not None:
+            stats.record_layer(expanded, len(layer) + (meeting is not None),
+                               len(forward_layer) + len(backward_layer))
+        if meeting is not None:
+            return _stitch_path(meeting, forward_parents, backward_parents)
+
+    return None
+
+
+def _expand_layer(layer, parents, other_parents, neighbors):
+    """
+    Expands every state in `layer`, recording parents for newly reached states.
+
+    Returns the next layer and the first state already reached by the
+    other side, or None if the two searches have not met yet.
+    """
+    next_layer = []
+    for state in layer:
+        for action, neighbor in neighbors(state):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (state, action)
+            if neighbor in other_parents:
+                # Both sides are expanded one full layer at a time, so the
+                # first meeting point lies on a shortest path.
+                return next_layer, neighbor
+            next_layer.append(neighbor)
+    return next_layer, None
+
+
+def _stitch_path(meeting, forward_parents, backward_parents):
+    """
+    Joins the forward path into `meeting` with the backward path out of it.
+    """
+    path = []
+    state = meeting
+    while forward_parents[state] is not None:
+        previous, action = forward_parents[state]
+        path.append((action, state))
+        state = previous
+    path.reverse()
+
+    state = meeting
+    while backward_parents[state] is not None:
+        following, action = backward_parents[state]
+        path.append((action, following))
+        state = following
+    return path
+
+
+def a_star_search(source, target, neighbors, heuristic, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, expanding states in order of path cost
+    plus `heuristic(state)`, an estimate of the remaining steps.
+
+    The heuristic must be consistent (never overestimate, and drop by at
+    most one per step) for the returned path to be shortest.
+    If `stats` is a SearchStats, the search records into it.
+
+    If no possible path, returns None.
+    """
+    costs = {source: 0}
+    # Among equal estimates, prefer the deeper node: it is closer to the target.
+    frontier = PriorityFrontier(
+        lambda node: (costs[node.state] + heuristic(node.state),
+                      -costs[node.state]))
+    frontier.add(Node(source, None, None))
+    explored = set()
+    if stats is not None:
+        neighbors = stats.instrument(neighbors, lambda: len(frontier.frontier))
+
+    while not frontier.empty():
+        node = frontier.remove()
+        if node.state in explored:
+            # A cheaper copy of this state was already expanded.
+            continue
+        if node.state == target:
+            path = []
+            while node.parent is not None:
+                path.append((node.action, node.state))
+                node = node.parent
+            path.reverse()
+            return path
+        explored.add(node.state)
+
+        cost = costs[node.state] + 1
+        for action, state in neighbors(node.state):
+            if state not in explored and cost < costs.get(state, cost + 1):
+                costs[state] = cost
+                frontier.add(Node(state, node, action))
+
+    return None
+
+
+def shortest_path_dag(source, target, neighbors, stats=None):
+    """
+    Returns a ShortestPathDAG holding every shortest path from the source
+    to the target, or None if they are not connected.
+
+    Like bidirectional_search, whole layers are grown from both ends, but
+    every parent of a newly reached state is kept rather than the first,
+    and the search stops only once the meeting layer is complete.
+    `neighbors(state)` must return (action, state) pairs.
+    If `stats` is a SearchStats, the search records into it.
+    """
+    # Maps each reached state to the (previous state, action) pairs one
+    # step closer to that side's root; the roots have none.
+    forward_parents = {source: []}
+    backward_parents = {target: []}
+    forward_layer = [source]
+    backward_layer = [target]
+    forward_depth = backward_depth = 0
+    if source == target:
+        return ShortestPathDAG(forward_parents, backward_parents, [source], 0)
+    if stats is not None:
+        neighbors = stats.instrument(
+            neighbors, lambda: len(forward_layer) + len(backward_layer),
+            track_layers=False)
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            if stats is not None:
+                stats.start_layer("forward", forward_depth)
+                expanded = len(forward_layer)
+            forward_depth += 1
+            forward_layer = _expand_dag_layer(
+                forward_layer, forward_parents, neighbors)
+            meeting = [state for state in forward_layer
+                       if state in backward_parents]
+            layer = forward_layer
+        else:
+            if stats is not None:
+                stats.start_layer("backward", backward_depth)
+                expanded = len(backward_layer)
+            backward_depth += 1
+            backward_layer = _expand_dag_layer(
+                backward_layer, backward_parents, neighbors)
+            meeting = [state for state in backward_layer
+                       if state in forward_parents]
+            layer = backward_layer
+
+        if stats is not None:
+            stats.record_layer(expanded, len(layer),
+                               len(forward_layer) + len(backward_layer))
+        if meeting:
+            # Neither side met the other one layer earlier, so every
+            # shortest path crosses from the last forward layer straight
+            # into the last backward layer, through one of these states.
+            return ShortestPathDAG(forward_parents, backward_parents, meeting,
+                                   forward_depth + backward_depth)
+
+    return None
+
+
+def _expand_dag_layer(layer, parents, neighbors):
+    """
+    Expands every state in `layer` and returns the next layer, recording
+    all parents in `layer` of each state in it.
+    """
+    next_layer = {}
+    for state in layer:
+        for action, neighbor in neighbors(state):
+            if neighbor in next_layer:
+                parents[neighbor].append((state, action))
+            elif neighbor not in parents:
+                parents[neighbor] = [(state, action)]
+                next_layer[neighbor] = None
+    return list(next_layer)
+
+
+class ShortestPathDAG():
+    """
+    All shortest paths between two states, stored as the layered parent
+    links of a search from each end, joined at the meeting states.
+
+    Paths are counted and enumerated from the links, so a pair connected
+    through many large casts does not need its paths held in memory.
+    """
+
+    def __init__(self, forward_parents, backward_parents, meeting, length):
+        self.forward_parents = forward_parents
+        self.backward_parents = backward_parents
+        self.meeting = meeting
+        self.length = length
+
+    def count(self):
+        """
+        Returns the number of distinct shortest paths.
+        """
+        forward_counts = {}
+        backward_counts = {}
+        return sum(_count_paths(state, self.forward_parents, forward_counts)
+                   * _count_paths(state, self.backward_parents, backward_counts)
+                   for state in self.meeting)
+
+    def __iter__(self):
+        """
+        Yields each shortest path as a list of (action, state) pairs,
+        holding only the path being built in memory.
+        """
+        for state in self.meeting:
+            for head in _paths_from_root(state, self.forward_parents):
+                for tail in _paths_to_root(state, self.backward_parents):
+                    yield head + tail
+
+
+def _count_paths(state, parents, counts):
+    """
+    Returns the number of paths from `state` back to the root of
+    `parents`, memoizing into `counts`.
+    """
+    if state not in counts:
+        links = parents[state]
+        if not links:
+            counts[state] = 1
+        else:
+            counts[state] = sum(_count_paths(previous, parents, counts)
+                                for previous, _ in links)
+    return counts[state]
+
+
+def _paths_from_root(state, parents):
+    links = parents[state]
+    if not links:
+        yield []
+        return
+    for previous, action in links:
+        for path in _paths_from_root(previous, parents):
+            path.append((action, state))
+            yield path
+
+
+def _paths_to_root(state, parents):
+    links = parents[state]
+    if not links:
+        yield []
+        return
+    for following, action in links:
+        for path in _paths_to_root(following, parents):
+            yield [(action, following)] + path
@@ -0,0 +1,299 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+from graph import INDEX_TYPE, OFFSET_TYPE, CompactGraph
+
+MAGIC = b"DEGSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+# Magic, format version, then the length of the JSON header that follows.
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+ARRAY_SECTIONS = ("person_offsets", "person_movies",
+                  "movie_offsets", "movie_people")
+STRING_SECTIONS = ("person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years")
+
+
+def fingerprint(directory):
+    """
+    Returns the (name, size, mtime) of each CSV file the snapshot is built from.
+    """
+    result = []
+    for name in SOURCE_FILES:
+        stat = os.stat(os.path.join(directory, name))
+        result.append([name, stat.st_size, stat.st_mtime_ns])
+    return result
+
+
+def write_snapshot(graph, path, source_fingerprint):
+    """
+    Writes `graph` to `path` as a versioned binary snapshot.
+
+    The file is written next to `path` first and then renamed over it,
+    so a reader never sees a half-written snapshot.
+    """
+    sections = {}
+    for name in ARRAY_SECTIONS:
+        sections[name] = _as_array(getattr(graph, name), name)
+    for name in STRING_SECTIONS:
+        offsets, blob = _encode_strings(getattr(graph, name))
+        sections[f"{name}.offsets"] = offsets
+        sections[f"{name}.blob"] = blob
+
+    # Sorted orders let the loader look up IDs and names by binary search
+    # instead of rebuilding dicts.
+    sections["person_id_order"] = array(INDEX_TYPE, sorted(
+        range(graph.num_people), key=graph.person_ids.__getitem__))
+    sections["movie_id_order"] = array(INDEX_TYPE, sorted(
+        range(graph.num_movies), key=graph.movie_ids.__getitem__))
+    sections["name_order"] = array(INDEX_TYPE, sorted(
+        range(graph.num_people), key=lambda i: graph.person_names[i].lower()))
+
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        size = len(data) * data.itemsize
+        layout[name] = [position, size, data.typecode]
+        position = _align(position + size)
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "sources": source_fingerprint,
+        "num_people": graph.num_people,
+        "num_movies": graph.num_movies,
+        "num_names": len({name.lower() for name in graph.person_names}),
+        "sections": layout,
+    }).encode("utf-8")
+    data_start = _align(PREAMBLE.size + len(header))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.seek(data_start + layout[name][0])
+            data.tofile(f)
+        f.truncate(data_start + position)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path, source_fingerprint=None):
+    """
+    Memory-maps the snapshot at `path` and returns (graph, names).
+
+    Returns None if the file is missing or truncated, was written by
+    another version or on another byte order, or does not match
+    `source_fingerprint`.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            return None
+
+    if len(buffer) < PREAMBLE.size:
+        return None
+    magic, version, header_size = PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    try:
+        header = json.loads(buffer[PREAMBLE.size:PREAMBLE.size + header_size])
+    except ValueError:
+        # Truncated or corrupt header
+        return None
+    if header["byteorder"] != sys.byteorder:
+        return None
+    if source_fingerprint is not None and header["sources"] != source_fingerprint:
+        return None
+
+    view = memoryview(buffer)
+    data_start = _align(PREAMBLE.size + header_size)
+    sections = {}
+    for name, (offset, size, typecode) in header["sections"].items():
+        start = data_start + offset
+        if start + size > len(buffer):
+            # Truncated file
+            return None
+        sections[name] = view[start:start + size].cast(typecode)
+
+    strings = {
+        name: StringTable(sections[f"{name}.offsets"], sections[f"{name}.blob"])
+        for name in STRING_SECTIONS
+    }
+    graph = CompactGraph(
+        strings["person_ids"], strings["person_names"], strings["person_births"],
+        strings["movie_ids"], strings["movie_titles"], strings["movie_years"],
+        *(sections[name] for name in ARRAY_SECTIONS),
+        person_index=SortedLookup(strings["person_ids"],
+                                  sections["person_id_order"]),
+        movie_index=SortedLookup(strings["movie_ids"],
+                                 sections["movie_id_order"]))
+    # Keeps the mapping open for as long as the graph uses it.
+    graph.buffer = buffer
+    names = NamesView(graph, sections["name_order"], header["num_names"])
+    return graph, names
+
+
+class StringTable(Sequence):
+    """
+    A read-only list of strings stored as an offsets array into a UTF-8 blob.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class SortedLookup(Mapping):
+    """
+    Maps each string in `keys` to its position, by binary search over
+    `order` (the positions sorted by key).
+    """
+
+    def __init__(self, keys, order):
+        self.keys_table = keys
+        self.order = order
+
+    def get(self, key, default=None):
+        order = self.order
+        i = bisect_left(order, key, key=self.keys_table.__getitem__)
+        if i < len(order) and self.keys_table[order[i]] == key:
+            return order[i]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.keys_table)
+
+    def __len__(self):
+        return len(self.keys_table)
+
+
+class NamesView(Mapping):
+    """
+    `names` dict over a snapshot, mapping lowercased names to the set of
+    corresponding person_ids.
+
+    Names of people added or renamed after loading are kept in `added`,
+    and person_ids whose snapshot entry no longer applies in `removed`.
+    """
+
+    def __init__(self, graph, order, size):
+        self.graph = graph
+        self.order = order
+        self.size = size
+        # The snapshot's own names, which `order` is sorted by
+        self.person_names = graph.person_names
+        self.person_ids = graph.person_ids
+        self.added = {}
+        self.removed = set()
+
+    def _key(self, person):
+        return self.person_names[person].lower()
+
+    def _snapshot_ids(self, name):
+        order = self.order
+        i = bisect_left(order, name, key=self._key)
+        person_ids = set()
+        while i < len(order) and self._key(order[i]) == name:
+            person_ids.add(self.person_ids[order[i]])
+            i += 1
+        return person_ids
+
+    def __getitem__(self, name):
+        person_ids = self._snapshot_ids(name) - self.removed
+        person_ids |= self.added.get(name, set())
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __iter__(self):
+        # One pass over the sorted order, yielding each name that still
+        # has a person not in `removed` (names in `added` come last).
+        previous = None
+        present = False
+        for person in self.order:
+            name = self._key(person)
+            if name != previous:
+                if present and previous not in self.added:
+                    yield previous
+                previous = name
+                present = False
+            if not present and self.person_ids[person] not in self.removed:
+                present = True
+        if present and previous not in self.added:
+            yield previous
+        yield from self.added
+
+    def __len__(self):
+        if not self.added and not self.removed:
+            return self.size
+        return sum(1 for _ in self)
+
+    def add(self, name, person_id):
+        self.added.setdefault(name, set()).add(person_id)
+
+    def discard(self, name, person_id):
+        person_ids = self.added.get(name)
+        if person_ids and person_id in person_ids:
+            person_ids.discard(person_id)
+            if not person_ids:
+                del self.added[name]
+        elif person_id in self._snapshot_ids(name):
+            self.removed.add(person_id)
+
+
+def _as_array(data, name):
+    """
+    Returns `data` as an array, copying it out of a memoryview if needed.
+    """
+    if isinstance(data, array):
+        return data
+    typecode = OFFSET_TYPE if name.endswith("offsets") else INDEX_TYPE
+    return array(typecode, data)
+
+
+def _encode_strings(strings):
+    offsets = array(OFFSET_TYPE, [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
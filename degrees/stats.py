@@ -0,0 +1,145 @@
+import time
+
+
+class SearchStats():
+    """
+    Counters filled in by a search when passed as `stats`: nodes expanded,
+    edges scanned, peak frontier size, duplicate suppressions (neighbors
+    skipped because they were already reached) and wall time per layer.
+
+    Each hook is called as `hook(event, data)` with event "expand"
+    (data: state, edges), "layer" (data: the layer record) or "finish"
+    (data: as_dict()). Searches only instrument themselves when given a
+    stats object, so there is no overhead when stats are off.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.mode = None
+        self.nodes_expanded = 0
+        self.edges_scanned = 0
+        self.peak_frontier = 0
+        self.duplicates = 0
+        self.layers = []
+        self.seconds = 0.0
+        self.path_length = None
+        self._started = None
+        self._layer = None
+        self._frontier_size = None
+
+    def start(self, mode=None):
+        self.mode = mode
+        self._started = time.perf_counter()
+
+    def finish(self, path):
+        if self._layer is not None:
+            self._close_layer()
+        # The search may have returned right after queuing neighbors.
+        self.sample_frontier()
+        self._frontier_size = None
+        self.path_length = None if path is None else len(path)
+        self.seconds = time.perf_counter() - self._started
+        self._emit("finish", self.as_dict())
+
+    def instrument(self, neighbors, frontier_size, track_layers=True):
+        """
+        Returns a neighbors function that records each expansion.
+
+        With `track_layers`, the first state expanded is taken as the root
+        and states are grouped into layers by their BFS depth from it.
+        Searches that expand whole layers themselves pass False and call
+        record_layer instead.
+        """
+        depth = {}
+        self._frontier_size = frontier_size
+
+        def instrumented(state):
+            # Sampled before expanding, so the frontier includes the
+            # neighbors queued by the previous expansion.
+            self.sample_frontier()
+            result = neighbors(state)
+            self.nodes_expanded += 1
+            self.edges_scanned += len(result)
+
+            if track_layers:
+                state_depth = depth.setdefault(state, 0)
+                if self._layer is None or self._layer["depth"] != state_depth:
+                    if self._layer is not None:
+                        self._close_layer()
+                    self._open_layer(None, state_depth)
+                self._layer["expanded"] += 1
+                self._layer["edges"] += len(result)
+                for _, neighbor in result:
+                    if neighbor in depth:
+                        self.duplicates += 1
+                    else:
+                        depth[neighbor] = state_depth + 1
+                        self._layer["discovered"] += 1
+
+            if self.hooks:
+                self._emit("expand", {"state": state, "edges": len(result)})
+            return result
+
+        return instrumented
+
+    def sample_frontier(self):
+        """
+        Updates the peak frontier from the instrumented search's current
+        frontier size.
+        """
+        if self._frontier_size is not None:
+            size = self._frontier_size()
+            if size > self.peak_frontier:
+                self.peak_frontier = size
+
+    def start_layer(self, side, depth):
+        self._open_layer(side, depth)
+
+    def record_layer(self, expanded, discovered, frontier):
+        """
+        Closes the layer opened by start_layer, for searches that expand
+        whole layers at a time.
+        """
+        layer = self._layer
+        layer["expanded"] = expanded
+        layer["edges"] = self.edges_scanned - layer.pop("edges_before")
+        layer["discovered"] = discovered
+        self.duplicates += layer["edges"] - discovered
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        self._close_layer()
+
+    def as_dict(self):
+        return {
+            "mode": self.mode,
+            "path_length": self.path_length,
+            "nodes_expanded": self.nodes_expanded,
+            "edges_scanned": self.edges_scanned,
+            "peak_frontier": self.peak_frontier,
+            "duplicates": self.duplicates,
+            "seconds": self.seconds,
+            "layers": self.layers,
+        }
+
+    def _open_layer(self, side, depth):
+        self._layer = {
+            "side": side,
+            "depth": depth,
+            "expanded": 0,
+            "edges": 0,
+            "discovered": 0,
+            "edges_before": self.edges_scanned,
+            "started": time.perf_counter(),
+        }
+
+    def _close_layer(self):
+        layer = self._layer
+        layer.pop("edges_before", None)
+        layer["seconds"] = time.perf_counter() - layer.pop("started")
+        self.layers.append(layer)
+        self._layer = None
+        self._emit("layer", layer)
+
+    def _emit(self, event, data):
+        for hook in self.hooks:
+            hook(event, data)
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+
+class BFSTreeCache():
+    """
+    LRU cache of full BFS trees over a CompactGraph, keyed by source
+    person index. Once a source's tree is cached, a path to any target
+    is read off by walking parents, with no search at all.
+
+    Trees are evicted least recently used first to keep the total size
+    of the cached parent arrays within `max_bytes`.
+    """
+
+    def __init__(self, graph, max_bytes):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def tree(self, source):
+        """
+        Returns the (parent_people, parent_movies) arrays for `source`,
+        computing and caching them on a miss.
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return tree
+
+        self.misses += 1
+        tree = self.graph.bfs_tree(source)
+        size = _tree_bytes(tree)
+        if size <= self.max_bytes:
+            while self.used_bytes + size > self.max_bytes:
+                _, evicted = self.trees.popitem(last=False)
+                self.used_bytes -= _tree_bytes(evicted)
+                self.evictions += 1
+            self.trees[source] = tree
+            self.used_bytes += size
+        return tree
+
+    def path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie, person) index pairs from
+        `source` to `target`, or None if they are not connected.
+
+        If `stats` is a SearchStats, each person walked through on the
+        way back from `target` counts as a node expanded.
+        """
+        if source == target:
+            return []
+        parent_people, parent_movies = self.tree(source)
+        # People added since the tree was cached have no movies yet.
+        if target >= len(parent_movies) or parent_movies[target] == -1:
+            return None
+        path = []
+        person = target
+        while person != source:
+            path.append((parent_movies[person], person))
+            person = parent_people[person]
+        if stats is not None:
+            stats.nodes_expanded += len(path)
+        path.reverse()
+        return path
+
+    def clear(self):
+        """
+        Drops every cached tree, e.g. after the graph changes.
+        """
+        self.trees.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "trees": len(self.trees),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _tree_bytes(tree):
+    return sum(len(parents) * parents.itemsize for parents in tree)
@@ -0,0 +1,206 @@
+import json
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+LINK_PATTERN = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+# Files at least this large are memory-mapped rather than read into memory
+MMAP_BYTES = 2 ** 20
+# Number of files handed to a process worker at a time
+BATCH_FILES = 64
+# Default name of the link cache, kept in the crawled directory
+LINK_CACHE_NAME = "links.cache.json"
+LINK_CACHE_VERSION = 1
+
+# Directory and set of page names for the workers, inherited when the
+# pool forks (or shared, for threads)
+_crawl = None
+
+
+def list_pages(directory):
+    """
+    Returns the HTML pages in `directory`, in directory listing order.
+    """
+    return [filename for filename in os.listdir(directory)
+            if filename.endswith(".html")]
+
+
+def crawl_pages(directory, workers=1, threads=False, pages=None,
+                cache=None):
+    """
+    Yields (page, links) for each HTML page in `directory`, in the order
+    of `pages` (by default `list_pages(directory)`), where `links` is the
+    set of other pages in the directory that the page links to.
+
+    Files are parsed by a pool of `workers` processes, or threads if
+    `threads` is true (enough when the files are on slow storage and
+    reading them dominates). Links are extracted as each file streams
+    through the regex, so no parsed file is held in memory at once.
+
+    If `cache` is the path of a link cache, only files whose size or
+    mtime differ from the ones cached are parsed, and the cache is
+    updated once every page has been yielded.
+    """
+    if pages is None:
+        pages = list_pages(directory)
+    if cache is not None:
+        yield from _crawl_cached(directory, workers, threads, pages, cache)
+        return
+
+    global _crawl
+    _crawl = (directory, frozenset(pages))
+    try:
+        yield from _map_pages(_page_links, pages, workers, threads)
+    finally:
+        _crawl = None
+
+
+def load_link_cache(path):
+    """
+    Returns the entries of the link cache at `path`, mapping each file
+    name to [size, mtime, links], or an empty dict if there is no usable
+    cache there.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != LINK_CACHE_VERSION:
+        return {}
+    return data["files"]
+
+
+def save_link_cache(path, entries):
+    """
+    Writes link cache `entries` to `path`, next to it first and then
+    renamed over it, so a reader never sees a half-written cache.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": LINK_CACHE_VERSION, "files": entries}, f,
+                  separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def _crawl_cached(directory, workers, threads, pages, cache):
+    cached = load_link_cache(cache)
+    entries = {}
+    stale = []
+    for page in pages:
+        # Statted before parsing, so a file changed while it is parsed
+        # is parsed again next time.
+        stat = os.stat(os.path.join(directory, page))
+        entry = cached.get(page)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            entries[page] = entry
+        else:
+            entries[page] = [stat.st_size, stat.st_mtime_ns, None]
+            stale.append(page)
+
+    global _crawl
+    # Cached links are kept unfiltered, since the pages they may name can
+    # come and go between crawls.
+    _crawl = (directory, None)
+    try:
+        for page, links in _map_pages(_page_links, stale, workers, threads):
+            entries[page][2] = sorted(links)
+    finally:
+        _crawl = None
+
+    page_set = frozenset(pages)
+    for page in pages:
+        # Pages never link to themselves: _page_links drops those.
+        links = set(entries[page][2])
+        links &= page_set
+        yield page, links
+    if stale or len(cached) != len(entries):
+        save_link_cache(cache, entries)
+
+
+def _map_pages(function, pages, workers, threads):
+    """
+    Yields `function(page)` for each of `pages`, in order, on a pool of
+    `workers` processes or threads.
+    """
+    if workers <= 1 or len(pages) <= 1:
+        yield from map(function, pages)
+    elif threads:
+        with ThreadPoolExecutor(workers) as executor:
+            yield from executor.map(function, pages)
+    elif "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            yield from pool.imap(function, pages, BATCH_FILES)
+    else:
+        with multiprocessing.Pool(workers, _init_worker,
+                                  (_crawl,)) as pool:
+            yield from pool.imap(function, pages, BATCH_FILES)
+
+
+def write_edge_list(directory, path, workers=1, threads=False):
+    """
+    Crawls `directory` like `crawl_pages` and writes its links to `path`
+    as they are found, one "page<TAB>link" line per link, and a line
+    with just the page for a page without links.
+
+    Returns (number of pages, number of links).
+    """
+    num_pages = num_links = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for page, links in crawl_pages(directory, workers, threads):
+            num_pages += 1
+            num_links += len(links)
+            if links:
+                f.writelines(f"{page}\t{link}\n" for link in sorted(links))
+            else:
+                f.write(f"{page}\n")
+    return num_pages, num_links
+
+
+def read_edge_list(path):
+    """
+    Reads a file written by `write_edge_list` back into a corpus dict.
+    """
+    corpus = dict()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            page, _, link = line.rstrip("\n").partition("\t")
+            links = corpus.setdefault(page, set())
+            if link:
+                links.add(link)
+    return corpus
+
+
+def _init_worker(crawl):
+    global _crawl
+    _crawl = crawl
+
+
+def _page_links(filename):
+    directory, pages = _crawl
+    links = set()
+    with open(os.path.join(directory, filename), "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _add_links(links, data, pages)
+        else:
+            _add_links(links, f.read(), pages)
+    links.discard(filename)
+    return filename, links
+
+
+def _add_links(links, data, pages):
+    """
+    Adds to `links` each link in `data` that names a page in `pages`, or
+    if `pages` is None, each link that could name an HTML page in the
+    same directory.
+    """
+    for match in LINK_PATTERN.finditer(data):
+        link = match.group(1).decode("utf-8", "replace")
+        if pages is None:
+            if link.endswith(".html") and "/" not in link:
+                links.add(link)
+        elif link in pages:
+            links.add(link)
@@ -0,0 +1,332 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+MAGIC = b"PRLINKS\0"
+EDGE_FILE_VERSION = 1
+
+# Magic, format version, then the length of the JSON header that follows.
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# The byte offset of every BLOCK_PAGES-th page's links is indexed, so
+# the links can be read back in independent blocks.
+BLOCK_PAGES = 4096
+# Approximate number of links decoded at a time while streaming
+CHUNK_LINKS = 2 ** 22
+# Number of varints encoded at a time while writing
+ENCODE_BATCH = 2 ** 20
+
+
+def write_edge_file(path, pages, rows):
+    """
+    Writes a corpus to `path` as a binary edge file, streaming its links.
+
+    `pages` is the list of page names, and `rows` yields the links of
+    each page in the same order (names of other pages, which must be in
+    `pages`). Each page's links are stored sorted, as varint-encoded
+    gaps between successive page indices, so only the page names and
+    one batch of links are held in memory.
+
+    The file is written next to `path` first and then renamed over it.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    out_degree = array("i")
+    block_offsets = array("q")
+    links_path = f"{path}.{os.getpid()}.links"
+    temp_path = f"{path}.{os.getpid()}.tmp"
+
+    position = 0
+    gaps = []
+    try:
+        with open(links_path, "wb") as links_file:
+            for i, links in enumerate(rows):
+                if i % BLOCK_PAGES == 0:
+                    position += _flush_gaps(gaps, links_file)
+                    block_offsets.append(position)
+                targets = sorted(index[link] for link in links)
+                out_degree.append(len(targets))
+                previous = 0
+                for target in targets:
+                    gaps.append(target - previous)
+                    previous = target
+                if len(gaps) >= ENCODE_BATCH:
+                    position += _flush_gaps(gaps, links_file)
+            position += _flush_gaps(gaps, links_file)
+            block_offsets.append(position)
+        if len(out_degree) != len(pages):
+            raise ValueError("expected the links of every page")
+
+        name_offsets, name_blob = _encode_strings(pages)
+        sections = {
+            "names.offsets": name_offsets,
+            "names.blob": name_blob,
+            "out_degree": out_degree,
+            "block_offsets": block_offsets,
+        }
+        layout = {}
+        offset = 0
+        for name, data in sections.items():
+            size = len(data) * data.itemsize
+            layout[name] = [offset, size, data.typecode]
+            offset = _align(offset + size)
+        layout["links"] = [offset, position, "B"]
+
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "num_pages": len(pages),
+            "num_links": sum(out_degree),
+            "block_pages": BLOCK_PAGES,
+            "sections": layout,
+        }).encode("utf-8")
+        data_start = _align(PREAMBLE.size + len(header))
+        with open(temp_path, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, EDGE_FILE_VERSION, len(header)))
+            f.write(header)
+            for name, data in sections.items():
+                f.seek(data_start + layout[name][0])
+                data.tofile(f)
+            f.seek(data_start + offset)
+            with open(links_path, "rb") as links_file:
+                shutil.copyfileobj(links_file, f)
+        os.replace(temp_path, path)
+    finally:
+        for leftover in (links_path, temp_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+class EdgeFile():
+    """
+    A memory-mapped edge file written by `write_edge_file`.
+
+    The links are decoded a block of pages at a time, so reading them,
+    or ranking the pages with `stream_power_iteration`, needs memory
+    for the pages but not for the links.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size = PREAMBLE.unpack_from(self.buffer)
+        if magic != MAGIC or version != EDGE_FILE_VERSION:
+            raise ValueError(f"{path} is not a version {EDGE_FILE_VERSION} "
+                             "edge file")
+        header = json.loads(self.buffer[PREAMBLE.size:
+                                         PREAMBLE.size + header_size])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on another byte order")
+        self.num_pages = header["num_pages"]
+        self.num_links = header["num_links"]
+        self.block_pages = header["block_pages"]
+
+        data_start = _align(PREAMBLE.size + header_size)
+        sections = {}
+        for name, (offset, size, typecode) in header["sections"].items():
+            dtype = np.dtype(typecode)
+            sections[name] = np.frombuffer(
+                self.buffer, dtype=dtype, count=size // dtype.itemsize,
+                offset=data_start + offset)
+        self.pages = PageNames(sections["names.offsets"],
+                               sections["names.blob"])
+        self.out_degree = sections["out_degree"]
+        self.block_offsets = sections["block_offsets"]
+        self.links = sections["links"]
+
+    def __len__(self):
+        return self.num_pages
+
+    def chunks(self, max_links=CHUNK_LINKS):
+        """
+        Yields (sources, targets): arrays of the page indices of the
+        links of successive runs of whole blocks of pages, each run with
+        about `max_links` links (or one block, if that has more).
+        """
+        num_blocks = len(self.block_offsets) - 1
+        degree_sums = np.zeros(num_blocks + 1, dtype=np.int64)
+        if self.num_pages:
+            np.cumsum(np.add.reduceat(
+                self.out_degree, np.arange(0, self.num_pages,
+                                           self.block_pages),
+                dtype=np.int64), out=degree_sums[1:])
+        block = 0
+        while block < num_blocks:
+            end = block + 1
+            while (end < num_blocks
+                   and degree_sums[end + 1] - degree_sums[block] <= max_links):
+                end += 1
+            first_page = block * self.block_pages
+            last_page = min(end * self.block_pages, self.num_pages)
+            targets = _decode_rows(
+                self.links[self.block_offsets[block]:self.block_offsets[end]],
+                self.out_degree[first_page:last_page])
+            sources = np.repeat(np.arange(first_page, last_page),
+                                self.out_degree[first_page:last_page])
+            yield sources, targets
+            block = end
+
+    def corpus_rows(self):
+        """
+        Yields (page, links) for each page, with the links as a set of
+        page names, like `crawler.crawl_pages`.
+        """
+        pages = self.pages
+        previous = 0
+        links = set()
+        for sources, targets in self.chunks():
+            for source, target in zip(sources.tolist(), targets.tolist()):
+                while previous < source:
+                    yield pages[previous], links
+                    previous += 1
+                    links = set()
+                links.add(pages[target])
+        while previous < self.num_pages:
+            yield pages[previous], links
+            previous += 1
+            links = set()
+
+
+class PageNames(Sequence):
+    """
+    A read-only list of page names stored as an offsets array into a
+    UTF-8 blob.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        data = self.blob[self.offsets[i]:self.offsets[i + 1]]
+        return data.tobytes().decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def stream_power_iteration(edges, damping_factor, tolerance, ranks=None,
+                           max_iterations=None):
+    """
+    Runs the power iteration of `matrix.power_iteration` over an
+    EdgeFile, streaming its links from disk once per iteration.
+
+    Only arrays with one entry per page are kept in memory, so corpora
+    with more links than fit in memory can be ranked.
+
+    Returns (ranks, iterations).
+    """
+    n = len(edges)
+    out_degree = np.asarray(edges.out_degree)
+    dangling = out_degree == 0
+    inverse_degree = np.divide(1.0, out_degree, out=np.zeros(n),
+                               where=~dangling)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        shares = ranks * inverse_degree
+        new_ranks = np.zeros(n)
+        for sources, targets in edges.chunks():
+            if len(targets) >= n:
+                new_ranks += np.bincount(targets, weights=shares[sources],
+                                         minlength=n)
+            else:
+                # Cheaper than a bincount over every page for small chunks
+                np.add.at(new_ranks, targets, shares[sources])
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor
+                      + damping_factor * ranks[dangling].sum()) / n
+        new_ranks /= new_ranks.sum()
+        iterations += 1
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+    return ranks, iterations
+
+
+def _flush_gaps(gaps, f):
+    """
+    Writes `gaps` to `f` as varints, empties it and returns the number
+    of bytes written.
+    """
+    if not gaps:
+        return 0
+    data = encode_varints(np.array(gaps, dtype=np.uint64))
+    gaps.clear()
+    f.write(data)
+    return len(data)
+
+
+def encode_varints(values):
+    """
+    Returns unsigned `values` as little-endian base-128 varints: 7 bits
+    per byte, with the high bit set on every byte but a value's last.
+    """
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    owner = np.repeat(np.arange(len(values)), lengths)
+    position = np.arange(lengths.sum()) - starts[owner]
+    data = ((values[owner] >> (np.uint64(7) * position.astype(np.uint64)))
+            & np.uint64(0x7F)).astype(np.uint8)
+    data[position < lengths[owner] - 1] |= 0x80
+    return data.tobytes()
+
+
+def decode_varints(data):
+    """
+    Returns the values of a run of complete varints as an int64 array.
+    """
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    owner = np.zeros(len(data), dtype=np.int64)
+    owner[starts[1:]] = 1
+    np.cumsum(owner, out=owner)
+    shifts = (np.arange(len(data)) - starts[owner]) * 7
+    parts = (data & 0x7F).astype(np.int64) << shifts
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+def _decode_rows(data, degrees):
+    """
+    Returns the page indices of consecutive pages' links from their
+    varint gaps, restarting the running sum at each page.
+    """
+    totals = np.cumsum(decode_varints(data))
+    if not len(totals):
+        return totals
+    # Subtract the running total reached before each page's first link.
+    row_starts = np.cumsum(degrees) - degrees
+    before = np.concatenate(([0], totals[:-1]))
+    return totals - np.repeat(before[row_starts[degrees > 0]],
+                              degrees[degrees > 0])
+
+
+def _encode_strings(strings):
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
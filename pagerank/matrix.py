@@ -0,0 +1,352 @@
+from itertools import chain, repeat
+
+import numpy as np
+
+# Typecodes for the CSR arrays: offsets can exceed 2**31 on big corpora,
+# while a page index always fits in 32 bits.
+OFFSET_TYPE = np.int64
+INDEX_TYPE = np.int32
+
+# Distances between successive iterates that the iteration can stop on
+NORMS = {
+    "l1": lambda change: np.abs(change).sum(),
+    "l2": np.linalg.norm,
+    "max": lambda change: np.abs(change).max(),
+}
+# Extrapolation replaces one iterate in this many
+EXTRAPOLATION_PERIOD = 10
+
+
+class TransitionMatrix():
+    """
+    The link structure of a corpus with page names interned to dense ints.
+
+    Rows are link targets: page `i` is linked to by the pages
+    `indices[indptr[i]:indptr[i + 1]]` (the usual CSR offset/index layout),
+    so one sparse mat-vec gathers the rank flowing into every page.
+    Pages without links are flagged in `dangling` rather than stored as
+    dense rows; their rank is spread evenly as a rank-one correction.
+    """
+
+    def __init__(self, pages, indptr, indices, out_degree):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+        self.out_degree = out_degree
+        self._page_index = None
+        self._derive()
+
+    def _derive(self):
+        """
+        Computes the arrays the iteration uses from the link arrays.
+        """
+        out_degree = self.out_degree
+        pages = self.pages
+        self.dangling = out_degree == 0
+        # Multiplying by this instead of dividing by the out-degree keeps
+        # dangling pages (which link nowhere) out of the mat-vec.
+        self.inverse_degree = np.divide(
+            1.0, out_degree, out=np.zeros(len(pages)), where=~self.dangling)
+        # reduceat cannot sum an empty row, so only rows with links are summed.
+        self.nonempty = np.flatnonzero(np.diff(self.indptr))
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix from a corpus as returned by `crawl`, mapping
+        each page to the set of pages it links to.
+        """
+        return cls.from_edges(*corpus_edges(corpus))
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Builds the matrix from parallel arrays of link sources and targets,
+        which must not contain duplicate links.
+        """
+        return cls(pages, *_link_arrays(len(pages), sources, targets))
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def num_links(self):
+        return len(self.indices)
+
+    @property
+    def page_index(self):
+        """
+        A dict mapping each page name to its index, built on first use.
+        """
+        if self._page_index is None:
+            self._page_index = {page: i for i, page in enumerate(self.pages)}
+        return self._page_index
+
+    def links(self):
+        """
+        Returns (sources, targets): parallel arrays of the page indices
+        of every link.
+        """
+        targets = np.repeat(np.arange(len(self.pages), dtype=INDEX_TYPE),
+                            np.diff(self.indptr))
+        return self.indices, targets
+
+    def apply_diff(self, diff):
+        """
+        Updates the matrix in place with a diff of pages and links, in the
+        format of pagerank.apply_diff, filtering links the same way.
+
+        The link arrays are edited with array operations rather than
+        rebuilt from a corpus, and new pages are numbered after the
+        existing ones, which keep their order.
+        """
+        index = self.page_index
+        n = len(self.pages)
+        sources, targets = self.links()
+
+        keep = np.ones(n, dtype=bool)
+        for page in diff.get("remove_pages", ()):
+            if page in index:
+                keep[index[page]] = False
+        # A page in "add_pages" gets a new set of links.
+        replaced = np.zeros(n, dtype=bool)
+        for page in diff.get("add_pages", {}):
+            if page in index:
+                replaced[index[page]] = True
+        removed_links = [index[page] * n + index[link]
+                         for page, link in diff.get("remove_links", ())
+                         if page in index and link in index]
+        kept = keep[sources] & keep[targets] & ~replaced[sources]
+        if removed_links:
+            kept &= ~np.isin(sources.astype(OFFSET_TYPE) * n + targets,
+                             removed_links)
+
+        # Renumber the remaining pages and append the new ones.
+        renumber = np.cumsum(keep) - 1
+        new_pages = [page for page in diff.get("add_pages", {})
+                     if page not in index or not keep[index[page]]]
+        if keep.all():
+            pages = self.pages + new_pages
+            new_index = dict(index)
+            new_index.update((page, n + i) for i, page in enumerate(new_pages))
+        else:
+            pages = [page for page, kept_page in zip(self.pages, keep)
+                     if kept_page] + new_pages
+            new_index = {page: i for i, page in enumerate(pages)}
+
+        removed_pairs = set(diff.get("remove_links", ()))
+        added = [(page, link)
+                 for page, links in diff.get("add_pages", {}).items()
+                 for link in links]
+        added.extend(diff.get("add_links", ()))
+        added = {(new_index[page], new_index[link])
+                 for page, link in added
+                 if page in new_index and link in new_index and page != link
+                 and (page, link) not in removed_pairs
+                 and not self._has_kept_link(page, link, keep, replaced)}
+        added = np.array(sorted(added), dtype=INDEX_TYPE).reshape(-1, 2)
+        sources = np.concatenate([renumber[sources[kept]], added[:, 0]])
+        targets = np.concatenate([renumber[targets[kept]], added[:, 1]])
+
+        self.pages = pages
+        self._page_index = new_index
+        self.indptr, self.indices, self.out_degree = _link_arrays(
+            len(pages), sources.astype(INDEX_TYPE), targets.astype(INDEX_TYPE))
+        self._derive()
+
+    def _has_kept_link(self, page, link, keep, replaced):
+        """
+        Returns whether the link from `page` to `link` exists and survives
+        the removals of the diff being applied.
+        """
+        index = self.page_index
+        source = index.get(page)
+        target = index.get(link)
+        if (source is None or target is None or replaced[source]
+                or not keep[source] or not keep[target]):
+            return False
+        row = self.indices[self.indptr[target]:self.indptr[target + 1]]
+        return bool((row == source).any())
+
+    def follow_links(self, ranks):
+        """
+        Returns the rank each page receives from the pages linking to it
+        when every page with links passes its rank evenly along them.
+        """
+        result = np.zeros(len(self.pages))
+        if len(self.indices):
+            shares = (ranks * self.inverse_degree)[self.indices]
+            result[self.nonempty] = np.add.reduceat(
+                shares, self.indptr[self.nonempty])
+        return result
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Returns the ranks after one step of the random surfer: follow a link
+        with probability `damping_factor`, otherwise jump to any page, and
+        jump to any page from a page without links.
+
+        If `teleport` is given, jumps land on pages in proportion to it
+        instead of uniformly.
+        """
+        dangling_rank = ranks[self.dangling].sum()
+        jump_rank = 1 - damping_factor + damping_factor * dangling_rank
+        result = self.follow_links(ranks)
+        result *= damping_factor
+        if teleport is None:
+            result += jump_rank / len(self.pages)
+        else:
+            result += teleport * jump_rank
+        return result
+
+    def as_dict(self, ranks):
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def corpus_edges(corpus):
+    """
+    Returns (pages, sources, targets) for a corpus: its pages in order,
+    and parallel arrays of page indices for each link, sorted by source.
+    Links to pages outside the corpus and to the page itself are ignored.
+    """
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    counts = np.fromiter((len(corpus[page]) for page in pages),
+                         dtype=OFFSET_TYPE, count=len(pages))
+    sources = np.repeat(np.arange(len(pages), dtype=INDEX_TYPE), counts)
+    targets = np.fromiter(
+        map(index.get, chain.from_iterable(corpus.values()), repeat(-1)),
+        dtype=INDEX_TYPE, count=len(sources))
+    keep = (targets >= 0) & (targets != sources)
+    return pages, sources[keep], targets[keep]
+
+
+def _link_arrays(n, sources, targets):
+    """
+    Returns (indptr, indices, out_degree) for `n` pages with the links
+    given as parallel arrays of sources and targets.
+    """
+    out_degree = np.bincount(sources, minlength=n)
+    order = np.argsort(targets, kind="stable")
+    indptr = np.zeros(n + 1, dtype=OFFSET_TYPE)
+    np.cumsum(np.bincount(targets, minlength=n), out=indptr[1:])
+    indices = sources[order].astype(INDEX_TYPE, copy=False)
+    return indptr, indices, out_degree
+
+
+def power_iteration(matrix, damping_factor, tolerance, ranks=None,
+                    max_iterations=None, teleport=None, method="power",
+                    norm="l1", trace=None):
+    """
+    Repeats `matrix.step` from `ranks` (uniform by default) until the
+    change between two iterations, measured in `norm` ("l1", "l2" or
+    "max"), is at most `tolerance`.
+
+    `method` picks how each iteration is computed:
+    - "power": a plain step of the whole vector (Jacobi),
+    - "aitken" or "quadratic": power steps, every EXTRAPOLATION_PERIOD
+      of which is replaced by an Aitken or quadratic extrapolation from
+      the last few iterates, which cancels the slowest-decaying error.
+    If `trace` is a list, the change after each iteration is appended.
+
+    With a (pages, k) array of `ranks` and of `teleport` vectors, all k
+    are iterated together over the one matrix, each only until it has
+    converged.
+
+    Returns (ranks, iterations).
+    """
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm {norm!r}")
+    if method not in ("power", "aitken", "quadratic"):
+        raise ValueError(f"unknown method {method!r}")
+    distance = NORMS[norm]
+    n = len(matrix)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    if ranks.ndim == 2:
+        if method != "power" or trace is not None:
+            raise ValueError("ranks are iterated together by power steps "
+                             "only, without a trace")
+        return _block_power_iteration(matrix, damping_factor, tolerance,
+                                      ranks, max_iterations, teleport,
+                                      distance)
+    history = [ranks]
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        new_ranks = matrix.step(ranks, damping_factor, teleport)
+        # The step preserves the total; renormalizing only stops drift.
+        new_ranks /= new_ranks.sum()
+        iterations += 1
+        change = distance(new_ranks - ranks)
+        if trace is not None:
+            trace.append(float(change))
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+        if method in ("aitken", "quadratic"):
+            history = history[-3:] + [ranks]
+            if iterations % EXTRAPOLATION_PERIOD == 0:
+                ranks = _extrapolate(method, history)
+                history = [ranks]
+    return ranks, iterations
+
+
+def _extrapolate(method, history):
+    """
+    Returns an extrapolation of the limit of the successive power
+    iterates in `history` (at least three for "aitken", four for
+    "quadratic"), or the last iterate if there are too few.
+    """
+    latest = history[-1]
+    if method == "aitken" and len(history) >= 3:
+        # Aitken delta-squared on the whole vector: the last two steps
+        # give the rate at which the error shrinks, and the error left
+        # after the latest step is summed as a geometric series.
+        first = history[-2] - history[-3]
+        last = latest - history[-2]
+        rate = last @ first / (first @ first)
+        if not 0 < rate < 1:
+            return latest
+        result = latest + rate / (1 - rate) * last
+    elif method == "quadratic" and len(history) >= 4:
+        # Assume the error lies in the span of the top three
+        # eigenvectors, and solve for their minimal polynomial by least
+        # squares (Kamvar et al.).
+        base = history[-4]
+        differences = np.stack([history[-3] - base, history[-2] - base],
+                               axis=1)
+        (gamma1, gamma2), *_ = np.linalg.lstsq(differences, base - latest,
+                                               rcond=None)
+        beta0, beta1 = gamma1 + gamma2 + 1, gamma2 + 1
+        result = beta0 * history[-3] + beta1 * history[-2] + latest
+    else:
+        return latest
+    # Extrapolating can overshoot below zero on pages that barely move.
+    np.maximum(result, 0, out=result)
+    total = result.sum()
+    return result / total if total > 0 else latest
+
+
+def _block_power_iteration(matrix, damping_factor, tolerance, ranks,
+                           max_iterations, teleport, distance):
+    # Each vector is stepped on its own, as contiguous rows: NumPy has no
+    # sparse matrix product, and a 2-D reduceat is slower than a 1-D
+    # one per vector.
+    ranks = np.array(ranks.T, order="C")
+    if teleport is not None:
+        teleport = np.ascontiguousarray(teleport.T)
+    active = list(range(len(ranks)))
+    iterations = 0
+    while active and (max_iterations is None or iterations < max_iterations):
+        iterations += 1
+        unconverged = []
+        for i in active:
+            new_ranks = matrix.step(ranks[i], damping_factor,
+                                    None if teleport is None else teleport[i])
+            new_ranks /= new_ranks.sum()
+            if distance(new_ranks - ranks[i]) > tolerance:
+                unconverged.append(i)
+            ranks[i] = new_ranks
+        # Converged vectors drop out of the remaining iterations.
+        active = unconverged
+    return ranks.T, iterations
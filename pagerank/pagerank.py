@@ -1,14 +1,44 @@
 # One test I can't get through. So referred to others' solution, as follows:
 # https://github.com/PLCoster/cs50ai-week2-pagerank/blob/2b6b17ba4861dd05300206826d4ab97cb1e42726/pagerank.py#L90
 
+import math
 import os
-import random
-import re
 import sys
-from collections import Counter
+
+from crawler import LINK_CACHE_NAME, crawl_pages, list_pages
+from sampling import LinkSampler, chain_intervals, walk_chains
+
+try:
+    import numpy as np
+
+    from edgefile import EdgeFile, stream_power_iteration, write_edge_file
+    from matrix import TransitionMatrix, power_iteration
+    from walkers import RandomSurfers, estimate
+except ImportError:
+    # Without NumPy, iterate_pagerank falls back to iterate_pagerank_python.
+    TransitionMatrix = RandomSurfers = EdgeFile = None
 
 DAMPING = 0.85
 SAMPLES = 10000
+# Surfers moved at once by sample_pagerank_walkers, and the groups they
+# are split into to estimate the variance
+WALKERS = 4096
+WALKER_GROUPS = 16
+# Steps each surfer takes before its visits count, to forget where it started
+BURN_IN = 50
+# Independent chains sample_pagerank splits its samples into by default
+# when sampling in parallel, seeded or with intervals
+CHAINS = 16
+# Iteration stops once the ranks change by at most this much in total (L1)
+TOLERANCE = 1e-6
+# Distances between successive rank vectors, by norm, for the iteration
+# without NumPy
+NORMS = {
+    "l1": lambda changes: sum(map(abs, changes)),
+    "l2": lambda changes: math.sqrt(sum(change * change
+                                        for change in changes)),
+    "max": lambda changes: max(map(abs, changes), default=0),
+}
 
 
 def main():
@@ -25,33 +55,62 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, with_link_index=False, workers=1, threads=False,
+          edge_file=None, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    Pages are parsed by `crawler.crawl_pages`, on a pool of `workers`
+    processes (or threads, if `threads` is true) when more than one.
+
+    If `with_link_index` is true, return (corpus, inbound, out_degree)
+    instead, as built by `link_index`.
 
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+    If `edge_file` is a path, write the links to it as they are parsed
+    (see `edgefile.write_edge_file`) instead of building the dictionary,
+    and return the opened EdgeFile, for `iterate_pagerank_file`.
 
+    If `cache` is true, each file's links are kept in a link cache
+    (LINK_CACHE_NAME in the directory, or the path `cache` if it is a
+    string) keyed by file name, size and mtime, and only new or changed
+    files are parsed again.
+    """
+    if cache is True:
+        cache = os.path.join(directory, LINK_CACHE_NAME)
+    cache = cache or None
+    if edge_file is not None:
+        if EdgeFile is None:
+            raise ImportError("edge files need NumPy")
+        names = list_pages(directory)
+        write_edge_file(edge_file, names, (
+            links for _, links in crawl_pages(directory, workers, threads,
+                                              names, cache)))
+        return EdgeFile(edge_file)
+
+    pages = dict(crawl_pages(directory, workers, threads, cache=cache))
+
+    if with_link_index:
+        return (pages, *link_index(pages))
     return pages
 
 
+def link_index(corpus):
+    """
+    Return (inbound, out_degree) for a corpus: `inbound` maps each page
+    to the list of pages linking to it, and `out_degree` maps each page
+    to the number of pages it links to.
+    """
+    inbound = {page: [] for page in corpus}
+    out_degree = dict()
+    for page, links in corpus.items():
+        out_degree[page] = len(links)
+        for link in links:
+            inbound[link].append(page)
+    return inbound, out_degree
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -81,72 +140,327 @@ def transition_model(corpus, page, damping_factor):
     return result_dict
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, link_weights=None, workers=1,
+                    chains=None, seed=None, with_interval=False):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    Each page's links are precomputed once, so every sample takes O(1)
+    instead of rebuilding the transition model. `link_weights` optionally
+    maps a page to {link: weight}, to follow its links in proportion to
+    those weights (links without a weight count 1).
+
+    If `workers`, `chains`, `seed` or `with_interval` is given, the
+    samples are split into `chains` (CHAINS by default) independent
+    chains with reproducible random streams derived from `seed` (see
+    `sampling.walk_chains`), run on a pool of `workers` processes, and
+    their counts are merged. If `with_interval` is true, return
+    (ranks, intervals) where `intervals` maps each page to the (low,
+    high) bounds of a 95% confidence interval for its rank, estimated
+    from the spread between chains. With a single chain there is no
+    spread to estimate it from, and both bounds are NaN.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    current_page = random.choice(list(corpus.keys()))
-    result_container = list()
-
-    while n > 0:
-        result_container.append(current_page)
-        current_transition_model = transition_model(corpus, current_page, damping_factor)
-        current_page = random.choices(list(current_transition_model.keys()), weights=list(
-            current_transition_model.values()), k=1)[0]
-        n -= 1
-
-    result = {key: value / sum(Counter(result_container).values())
-              for key, value in Counter(result_container).items()}
-
+    sampler = LinkSampler(corpus, damping_factor, link_weights)
+    if (workers <= 1 and chains is None and seed is None
+            and not with_interval):
+        return sampler.as_dict(sampler.walk(n))
+
+    chain_counts = walk_chains(sampler, n, chains or CHAINS, workers, seed)
+    ranks, half_widths = chain_intervals(chain_counts)
+    result = dict(zip(sampler.pages, ranks))
+    if with_interval:
+        # Bounds clipped this way round stay NaN for NaN half widths.
+        intervals = {page: (max(rank - half_width, 0.0),
+                            min(rank + half_width, 1.0))
+                     for page, rank, half_width
+                     in zip(sampler.pages, ranks, half_widths)}
+        return result, intervals
     return result
 
 
-def iterate_pagerank(corpus, damping_factor):
+def sample_pagerank_walkers(corpus, damping_factor, n, walkers=WALKERS,
+                            seed=None, with_variance=False):
+    """
+    Return PageRank values like `sample_pagerank`, but from `walkers`
+    random surfers moved together with NumPy, taking at least `n`
+    samples in total. `seed` seeds the random generator, so the same
+    seed gives the same estimate.
+
+    The surfers are split into groups whose estimates are independent;
+    if `with_variance` is true, return (ranks, variances) where
+    `variances` maps each page to the variance of its estimated rank.
+    """
+    if RandomSurfers is None:
+        raise ImportError("sample_pagerank_walkers needs NumPy")
+    surfers = RandomSurfers.from_corpus(corpus)
+    walkers = max(1, min(walkers, n))
+    steps = -(-n // walkers)
+    counts = surfers.simulate(damping_factor, steps, walkers,
+                              np.random.default_rng(seed),
+                              groups=min(WALKER_GROUPS, walkers),
+                              burn_in=BURN_IN)
+    ranks, variances = estimate(counts)
+    ranks = dict(zip(surfers.pages, ranks.tolist()))
+    if with_variance:
+        return ranks, dict(zip(surfers.pages, variances.tolist()))
+    return ranks
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, start=None,
+                     method="power", norm="l1", trace=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    The corpus is converted once into a sparse transition matrix, and
+    each iteration is a sparse mat-vec over the links (pages without
+    links are spread over the whole corpus as a rank-one correction),
+    until the ranks change by at most `tolerance` in total.
+    Iteration starts from the ranks in `start` if given (see
+    `starting_ranks`), otherwise from 1/N for every page.
+
+    `method` is "power" (the plain iteration), "aitken" or "quadratic"
+    for power iteration with periodic extrapolation (see
+    `matrix.power_iteration`), or "gauss-seidel", which updates each page
+    in place with `iterate_pagerank_python`: it takes fewer iterations,
+    but only a page at a time. `norm` ("l1", "l2" or "max") is how the
+    change is measured. If `trace` is a list, the change after each
+    iteration is appended to it, to compare methods or check how far
+    the ranks have converged.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    n = len(corpus)
-    constant = (1 - damping_factor) / n
+    if TransitionMatrix is None or method == "gauss-seidel":
+        return iterate_pagerank_python(corpus, damping_factor, tolerance,
+                                       start=start, method=method, norm=norm,
+                                       trace=trace)
+    matrix = TransitionMatrix.from_corpus(corpus)
+    return _iterate_matrix(matrix, damping_factor, tolerance, start, method,
+                           norm, trace)
+
+
+def _iterate_matrix(matrix, damping_factor, tolerance, start, method="power",
+                    norm="l1", trace=None):
+    ranks = None
+    if start is not None:
+        # As starting_ranks, straight into an array
+        n = len(matrix)
+        ranks = np.fromiter((start.get(page, 1 / n) for page in matrix.pages),
+                            dtype=float, count=n)
+        ranks /= ranks.sum()
+    ranks, _ = power_iteration(matrix, damping_factor, tolerance, ranks,
+                               method=method, norm=norm, trace=trace)
+    return matrix.as_dict(ranks)
+
+
+def iterate_pagerank_file(edges, damping_factor, tolerance=TOLERANCE,
+                          dense=False):
+    """
+    Return the same PageRank values as `iterate_pagerank` for a corpus
+    stored as an edge file (an EdgeFile, or the path of one written by
+    `crawl`).
+
+    Each iteration streams the links from disk once, so only a few
+    values per page are held in memory, however many links there are.
+    If `dense` is true, return the ranks as an array in the order of
+    `edges.pages` rather than as a dictionary.
+    """
+    if EdgeFile is None:
+        raise ImportError("iterate_pagerank_file needs NumPy")
+    if not isinstance(edges, EdgeFile):
+        edges = EdgeFile(edges)
+    ranks, _ = stream_power_iteration(edges, damping_factor, tolerance)
+    if dense:
+        return ranks
+    return dict(zip(edges.pages, ranks.tolist()))
+
+
+def personalized_pagerank(corpus, damping_factor, seeds, tolerance=TOLERANCE,
+                          dense=False):
+    """
+    Return PageRank values for a surfer who, instead of jumping to any
+    page, jumps to the pages of a seed set, for each of many seed sets.
 
-    result = {key: (1 / n) for key in corpus.keys()}
-    new_result = {key: 0 for key in corpus.keys()}
-    max_change = 1 / n
+    `seeds` is a list of seed sets, each a set of pages to jump to evenly
+    or a dict mapping pages to jump weights, or a NumPy array of shape
+    (pages, seed sets) with one teleport vector per column and rows in
+    corpus order. All seed sets are iterated together over a single
+    transition matrix, each until its ranks have converged.
 
-    while max_change > 0.001:
-        max_change = 0
-        for page in corpus:
-            sigma_of_linked_page = 0
-            for each_other_page in corpus:
-                if len(corpus.get(each_other_page)) == 0:
-                    sigma_of_linked_page += result.get(each_other_page) / n
-                elif page in corpus.get(each_other_page):
-                    sigma_of_linked_page += result.get(each_other_page) / \
-                        len(corpus.get(each_other_page))
-            new_pr = constant + damping_factor * sigma_of_linked_page
-            new_result[page] = new_pr
-
-        # Normalize the new page ranks:
-        norm_factor = sum(new_result.values())
-        new_result = {page: (pr / norm_factor) for page, pr in new_result.items()}
+    Return a list with a rank dictionary per seed set, or if `dense` is
+    true, an array of shape (pages, seed sets) with rows in corpus order.
+    """
+    if TransitionMatrix is None:
+        raise ImportError("personalized_pagerank needs NumPy")
+    matrix = TransitionMatrix.from_corpus(corpus)
+    if isinstance(seeds, np.ndarray):
+        teleport = seeds.astype(float)
+    else:
+        teleport = np.zeros((len(matrix), len(seeds)))
+        index = matrix.page_index
+        for column, seed_set in enumerate(seeds):
+            if not isinstance(seed_set, dict):
+                seed_set = dict.fromkeys(seed_set, 1)
+            for page, weight in seed_set.items():
+                teleport[index[page], column] = weight
+    totals = teleport.sum(axis=0)
+    if np.any(totals <= 0):
+        raise ValueError("every seed set needs a page with positive weight")
+    teleport /= totals
+
+    # Each seed set starts from its own teleport vector.
+    ranks, _ = power_iteration(matrix, damping_factor, tolerance, teleport,
+                               teleport=teleport)
+    if dense:
+        return ranks
+    return [matrix.as_dict(column) for column in ranks.T]
+
+
+def iterate_pagerank_python(corpus, damping_factor, tolerance=TOLERANCE,
+                            inbound=None, out_degree=None, start=None,
+                            method="power", norm="l1", trace=None):
+    """
+    Return the same PageRank values as `iterate_pagerank` without NumPy.
 
+    Each iteration visits every link once through the inbound link index
+    (built with `link_index` unless given, e.g. from `crawl`), and the
+    rank of pages without links is summed once per iteration and shared
+    evenly by all pages.
+
+    With `method` "gauss-seidel", each page is updated in place from the
+    ranks already updated in the same pass. The extrapolation methods
+    need NumPy.
+    """
+    if method not in ("power", "gauss-seidel"):
+        raise ValueError(f"method {method!r} is not available without NumPy")
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm {norm!r}")
+    distance = NORMS[norm]
+    if inbound is None or out_degree is None:
+        inbound, out_degree = link_index(corpus)
+    n = len(corpus)
+    if start is None:
+        ranks = {page: 1 / n for page in corpus}
+    else:
+        ranks = starting_ranks(corpus, start)
+    dangling = [page for page in corpus if out_degree[page] == 0]
+
+    while True:
+        dangling_rank = sum(ranks[page] for page in dangling)
+        if method == "gauss-seidel":
+            new_ranks = _gauss_seidel_pass(corpus, ranks, damping_factor,
+                                           inbound, out_degree, dangling_rank)
+        else:
+            base = (1 - damping_factor + damping_factor * dangling_rank) / n
+            # Each page passes its rank evenly along its links.
+            shares = {page: ranks[page] / out_degree[page]
+                      for page in corpus if out_degree[page]}
+            new_ranks = {
+                page: base + damping_factor * sum(shares[other]
+                                                  for other in inbound[page])
+                for page in corpus
+            }
+
+        norm_factor = sum(new_ranks.values())
         for page in corpus:
-            if abs(result.get(page) - new_result.get(page)) > max_change:
-                max_change = abs(result.get(page) - new_result.get(page))
+            new_ranks[page] /= norm_factor
+        change = distance([new_ranks[page] - ranks[page] for page in corpus])
+        if trace is not None:
+            trace.append(change)
+        ranks = new_ranks
+        if change <= tolerance:
+            return ranks
 
-        # Why is this necessary to have a shallow
-        result = new_result.copy()
 
-    return result
+def _gauss_seidel_pass(corpus, ranks, damping_factor, inbound, out_degree,
+                       dangling_rank):
+    n = len(corpus)
+    ranks = dict(ranks)
+    # Without a fixed total of 1 during the pass, teleporting carries
+    # 1 - d of whatever the total is now.
+    total = sum(ranks.values())
+    for page in corpus:
+        rank = damping_factor * sum(ranks[other] / out_degree[other]
+                                    for other in inbound[page])
+        rank += ((1 - damping_factor) * total
+                 + damping_factor * dangling_rank) / n
+        total += rank - ranks[page]
+        if not out_degree[page]:
+            dangling_rank += rank - ranks[page]
+        ranks[page] = rank
+    return ranks
+
+
+def update_pagerank(corpus, ranks, diff, damping_factor, tolerance=TOLERANCE,
+                    matrix=None):
+    """
+    Apply `diff` to `corpus` in place (see `apply_diff`) and return the
+    new PageRank values, iterating from the previous `ranks` instead of
+    from scratch.
+
+    A small edit only moves the ranks near it, so starting from the old
+    ranks takes a few iterations rather than a full recomputation.
+    If `matrix` is the TransitionMatrix of the corpus before the diff
+    (kept between updates), it is updated in place rather than rebuilt.
+    """
+    apply_diff(corpus, diff)
+    if matrix is None:
+        return iterate_pagerank(corpus, damping_factor, tolerance, start=ranks)
+    matrix.apply_diff(diff)
+    return _iterate_matrix(matrix, damping_factor, tolerance, ranks)
+
+
+def apply_diff(corpus, diff):
+    """
+    Update `corpus` in place with a diff of pages and links, a dictionary
+    with any of these keys:
+
+      "add_pages": {page: links} for new pages, or pages to replace
+      "remove_pages": pages to remove, with every link to them
+      "add_links": (page, link) pairs
+      "remove_links": (page, link) pairs
+
+    Links to pages not in the corpus, and from a page to itself, are
+    ignored, as in `crawl`.
+    """
+    removed = set(diff.get("remove_pages", ()))
+    for page in removed:
+        corpus.pop(page, None)
+    if removed:
+        for links in corpus.values():
+            links -= removed
+    for page, links in diff.get("add_pages", {}).items():
+        corpus[page] = set(links)
+    for page, link in diff.get("add_links", ()):
+        corpus[page].add(link)
+    for page, link in diff.get("remove_links", ()):
+        corpus[page].discard(link)
+    # Links may name pages added later in the same diff, so they are
+    # only checked once the whole diff is in.
+    for page in set(diff.get("add_pages", {})).union(
+            page for page, _ in diff.get("add_links", ())):
+        corpus[page] = {link for link in corpus[page]
+                        if link in corpus and link != page}
+    return corpus
+
+
+def starting_ranks(corpus, ranks):
+    """
+    Return a rank for every page of `corpus` to start iterating from,
+    taken from `ranks` where it has one (new pages get 1/N), and scaled
+    to sum to 1.
+    """
+    n = len(corpus)
+    result = {page: ranks.get(page, 1 / n) for page in corpus}
+    total = sum(result.values())
+    return {page: rank / total for page, rank in result.items()}
 
 
 # def iterate_pagerank(corpus, damping_factor):
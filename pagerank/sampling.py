@@ -0,0 +1,258 @@
+import math
+import multiprocessing
+import random
+
+# Confidence level of the intervals from chain_intervals
+CONFIDENCE = 0.95
+
+# The sampler for the workers, inherited when the pool forks
+_sampler = None
+
+
+class AliasTable():
+    """
+    Draws index `i` with probability proportional to `weights[i]` in O(1),
+    using Vose's alias method.
+
+    Each of the n slots is picked uniformly and then keeps its own index
+    with probability `probabilities[slot]`, or else yields `aliases[slot]`.
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("an alias table needs a positive total weight")
+        scaled = [weight * n / total for weight in weights]
+        self.probabilities = [1.0] * n
+        self.aliases = list(range(n))
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            # The large slot gives away what fills up the small one.
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left over is 1 up to rounding, and keeps its slot.
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def sample(self, rand):
+        """
+        Returns an index drawn with `rand`, a function returning uniform
+        floats in [0, 1), from a single draw.
+        """
+        position = rand() * len(self.probabilities)
+        slot = int(position)
+        if position - slot < self.probabilities[slot]:
+            return slot
+        return self.aliases[slot]
+
+
+class LinkSampler():
+    """
+    The random surfer of a corpus, with page names interned to dense ints
+    and each page's links stored as a tuple, so every step is O(1).
+
+    With probability `damping_factor` the surfer follows one of the
+    current page's links (uniformly, or through an AliasTable when the
+    page's links are weighted), otherwise, or from a page without links,
+    it jumps to a page chosen uniformly from the whole corpus.
+
+    `tables` holds each page's AliasTable (None for unweighted pages), or
+    is None when no links are weighted at all.
+    """
+
+    def __init__(self, corpus, damping_factor, link_weights=None):
+        self.pages = list(corpus)
+        self.damping_factor = damping_factor
+        index = {page: i for i, page in enumerate(self.pages)}
+        if not link_weights:
+            get = index.get
+            self.outlinks = [
+                tuple([i for i in map(get, corpus[page]) if i is not None])
+                for page in self.pages
+            ]
+            self.tables = None
+            return
+
+        self.outlinks = []
+        self.tables = []
+        for page in self.pages:
+            links = [link for link in corpus[page] if link in index]
+            weights = link_weights.get(page)
+            if weights:
+                self.tables.append(
+                    AliasTable([weights.get(link, 1) for link in links])
+                    if links else None)
+            else:
+                self.tables.append(None)
+            self.outlinks.append(tuple(index[link] for link in links))
+
+    def walk(self, n, rng=random, start=None):
+        """
+        Takes `n` steps from `start` (a page index, random by default)
+        drawing from `rng`, a random.Random or the random module.
+
+        Returns a list of how many steps ended on each page, in the
+        order of `pages`.
+        """
+        num_pages = len(self.pages)
+        damping_factor = self.damping_factor
+        outlinks = self.outlinks
+        tables = self.tables
+        rand = rng.random
+        counts = [0] * num_pages
+
+        current = int(rand() * num_pages) if start is None else start
+        if tables is None:
+            # No weighted links, so no table to look up on each step
+            for _ in range(n):
+                counts[current] += 1
+                links = outlinks[current]
+                if links and rand() < damping_factor:
+                    current = links[int(rand() * len(links))]
+                else:
+                    current = int(rand() * num_pages)
+            return counts
+
+        for _ in range(n):
+            counts[current] += 1
+            links = outlinks[current]
+            if links and rand() < damping_factor:
+                table = tables[current]
+                if table is None:
+                    current = links[int(rand() * len(links))]
+                else:
+                    current = links[table.sample(rand)]
+            else:
+                current = int(rand() * num_pages)
+        return counts
+
+    def as_dict(self, counts):
+        """
+        Returns `counts` as a dict mapping each page to its share of them.
+        """
+        total = sum(counts)
+        return {page: count / total for page, count in zip(self.pages, counts)}
+
+
+def walk_chains(sampler, n, chains, workers=1, seed=None):
+    """
+    Splits `n` steps of `sampler` into `chains` independent walks (at
+    most `n`, so that every walk takes a step), run on a pool of
+    `workers` processes when more than one, and returns the list of
+    counts of each walk.
+
+    Chain `i` draws from its own random.Random seeded with `seed` and
+    `i`, so a given seed gives the same counts whatever the number of
+    workers.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    chains = max(1, min(chains, n))
+    tasks = [(n // chains + (i < n % chains), f"{seed}/{i}")
+             for i in range(chains)]
+
+    global _sampler
+    _sampler = sampler
+    try:
+        if workers <= 1 or chains <= 1:
+            return list(map(_walk_chain, tasks))
+        if "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                return pool.map(_walk_chain, tasks, 1)
+        with multiprocessing.Pool(workers, _init_worker,
+                                  (sampler,)) as pool:
+            return pool.map(_walk_chain, tasks, 1)
+    finally:
+        _sampler = None
+
+
+def chain_intervals(chain_counts, confidence=CONFIDENCE):
+    """
+    Returns (ranks, half_widths) from the counts of independent chains as
+    returned by `walk_chains`.
+
+    `ranks` pools the visits of all chains. Each chain's share of visits
+    is an independent estimate of the ranks, so their spread gives the
+    standard error of the pooled estimate. With only a few chains that
+    spread is itself uncertain, so `half_widths` is the Student-t
+    quantile for `confidence` times the standard error. Chains without
+    any visits are left out, and with fewer than two chains left the
+    spread is unknown and every half width is NaN.
+    """
+    chain_counts = [counts for counts in chain_counts if any(counts)]
+    totals = [sum(counts) for counts in chain_counts]
+    grand_total = sum(totals)
+    ranks = [sum(visits) / grand_total for visits in zip(*chain_counts)]
+    chains = len(chain_counts)
+    if chains < 2:
+        return ranks, [math.nan] * len(ranks)
+    quantile = t_quantile(confidence, chains - 1)
+    half_widths = []
+    for visits in zip(*chain_counts):
+        shares = [count / total for count, total in zip(visits, totals)]
+        mean = sum(shares) / chains
+        variance = sum((share - mean) ** 2 for share in shares) / (chains - 1)
+        half_widths.append(quantile * math.sqrt(variance / chains))
+    return ranks, half_widths
+
+
+def t_quantile(confidence, df):
+    """
+    Returns t such that a Student-t variable with `df` (a positive int)
+    degrees of freedom lies within [-t, t] with probability `confidence`,
+    by bisection on `_t_within`.
+    """
+    low, high = 0.0, 1.0
+    while _t_within(high, df) < confidence:
+        low, high = high, high * 2
+    for _ in range(60):
+        middle = (low + high) / 2
+        if _t_within(middle, df) < confidence:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def _t_within(t, df):
+    """
+    Returns P(|T| <= t) for a Student-t variable T with `df` degrees of
+    freedom, from the finite series for integer `df` (Abramowitz and
+    Stegun 26.7.3-4).
+    """
+    theta = math.atan(t / math.sqrt(df))
+    cos_squared = math.cos(theta) ** 2
+    if df % 2 == 0:
+        term = total = 1.0
+        for k in range(2, df, 2):
+            term *= cos_squared * (k - 1) / k
+            total += term
+        return math.sin(theta) * total
+    if df == 1:
+        return 2 * theta / math.pi
+    term = total = math.cos(theta)
+    for k in range(3, df, 2):
+        term *= cos_squared * (k - 1) / k
+        total += term
+    return 2 / math.pi * (theta + math.sin(theta) * total)
+
+
+def _init_worker(sampler):
+    global _sampler
+    _sampler = sampler
+
+
+def _walk_chain(task):
+    steps, seed = task
+    return _sampler.walk(steps, random.Random(seed))
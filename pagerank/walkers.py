@@ -0,0 +1,99 @@
+import numpy as np
+
+from matrix import OFFSET_TYPE, corpus_edges
+
+# Visits are buffered and counted this many at a time
+CHUNK_VISITS = 2 ** 22
+
+
+class RandomSurfers():
+    """
+    The links of a corpus as CSR arrays indexed by source page, for moving
+    many random surfers at once: page `i` links to the pages
+    `links[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, pages, offsets, links):
+        self.pages = pages
+        self.offsets = offsets
+        self.links = links
+        self.out_degree = np.diff(offsets)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        # corpus_edges returns the links sorted by source already.
+        pages, sources, targets = corpus_edges(corpus)
+        offsets = np.zeros(len(pages) + 1, dtype=OFFSET_TYPE)
+        np.cumsum(np.bincount(sources, minlength=len(pages)), out=offsets[1:])
+        return cls(pages, offsets, targets)
+
+    def simulate(self, damping_factor, steps, walkers, rng, groups=1,
+                 burn_in=0):
+        """
+        Moves `walkers` surfers `steps` times each, starting from uniformly
+        random pages and drawing from `rng`, a numpy.random.Generator.
+        The first `burn_in` moves, while the surfers are still close to
+        their random start, are made before counting begins.
+
+        Walkers are dealt round-robin into `groups`, and the visits of each
+        group are counted separately. Returns an array of shape
+        (groups, pages) of visit counts.
+        """
+        n = len(self.pages)
+        positions = rng.integers(0, n, walkers)
+        for _ in range(burn_in):
+            positions = self.step(positions, damping_factor, rng)
+        # Counting visits at position + offset sorts them into their group.
+        group_offsets = np.arange(walkers) % groups * n
+        counts = np.zeros(groups * n, dtype=np.int64)
+        chunk = max(1, min(steps, CHUNK_VISITS // walkers))
+        buffer = np.empty((chunk, walkers), dtype=np.int64)
+        filled = 0
+        for _ in range(steps):
+            np.add(positions, group_offsets, out=buffer[filled])
+            filled += 1
+            if filled == len(buffer):
+                counts += np.bincount(buffer.ravel(), minlength=groups * n)
+                filled = 0
+            positions = self.step(positions, damping_factor, rng)
+        if filled:
+            counts += np.bincount(buffer[:filled].ravel(),
+                                  minlength=groups * n)
+        return counts.reshape(groups, n)
+
+    def step(self, positions, damping_factor, rng):
+        """
+        Returns where surfers at `positions` go next: each follows a
+        uniformly chosen link with probability `damping_factor`, and
+        otherwise, or when its page has no links, teleports to a
+        uniformly chosen page.
+        """
+        degree = self.out_degree[positions]
+        teleport = rng.random(len(positions)) >= damping_factor
+        teleport |= degree == 0
+        follow = ~teleport
+        degree = degree[follow]
+        picks = self.offsets[positions[follow]] + (
+            rng.random(len(degree)) * degree).astype(OFFSET_TYPE)
+        positions = positions.copy()
+        positions[follow] = self.links[picks]
+        positions[teleport] = rng.integers(0, len(self.pages), teleport.sum())
+        return positions
+
+
+def estimate(counts):
+    """
+    Returns (ranks, variances) from per-group visit counts as returned by
+    `RandomSurfers.simulate`.
+
+    Each group's share of visits is an independent estimate of the ranks;
+    `ranks` pools all visits, and `variances` is the variance of that
+    pooled estimate as judged from the spread between groups (NaN with
+    a single group).
+    """
+    ranks = counts.sum(axis=0) / counts.sum()
+    groups = len(counts)
+    if groups < 2:
+        return ranks, np.full(counts.shape[1], np.nan)
+    shares = counts / counts.sum(axis=1, keepdims=True)
+    return ranks, shares.var(axis=0, ddof=1) / groups